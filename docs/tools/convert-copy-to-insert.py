@@ -1,4 +1,12 @@
 import re
+from itertools import islice
+
+from copy_codec import sql_values_rows
+
+# จำนวนแถวที่แปลงและเขียนลงไฟล์ต่อครั้ง
+BATCH_SIZE = 10000
+# บรรทัดจบข้อมูลของ COPY block (รองรับไฟล์ที่ขึ้นบรรทัดแบบ LF และ CRLF และบรรทัดสุดท้ายที่ไม่มี newline)
+END_OF_DATA_LINES = (b'\\.\n', b'\\.\r\n', b'\\.', b'\\.\r')
 
 def parse_copy_line(line):
     # ตัวอย่าง: COPY "B01".tb_unit (id, name, ...) FROM stdin;
@@ -9,40 +17,55 @@ def parse_copy_line(line):
     columns = [col.strip() for col in m.group(2).split(',')]
     return table, columns
 
-def sql_value(val):
-    if val == r'\N':
-        return 'NULL'
-    # escape single quote
-    return "'" + val.replace("'", "''") + "'"
+def find_end_of_data(batch):
+    # หา index ของบรรทัด \. ใน batch คืน None ถ้าไม่พบ
+    found = [batch.index(line) for line in END_OF_DATA_LINES if line in batch]
+    return min(found) if found else None
+
+def read_copy_batches(fin):
+    # อ่านแถวข้อมูลของ COPY block ทีละ batch จนถึงบรรทัด \.
+    # islice + list.index ทำให้ loop อ่านและหาบรรทัดจบอยู่ในระดับ C
+    while True:
+        start = fin.tell()
+        batch = list(islice(fin, BATCH_SIZE))
+        end = find_end_of_data(batch)
+        if end is not None:
+            # ย้อนตำแหน่งไฟล์กลับไปหลังบรรทัด \. เพื่อให้อ่าน statement ถัดไปต่อได้
+            fin.seek(start + sum(map(len, batch[:end + 1])))
+            batch = batch[:end]
+        if batch:
+            block = b''.join(batch)
+            # \r ในข้อมูล COPY ต้อง escape เป็น \r เสมอ ตัว \r จริงจึงเป็นส่วนของ CRLF เท่านั้น
+            if b'\r' in block:
+                block = block.replace(b'\r\n', b'\n')
+                if block.endswith(b'\r'):
+                    block = block[:-1]
+            if block.endswith(b'\n'):
+                block = block[:-1]
+            yield block.split(b'\n')
+        if end is not None or len(batch) < BATCH_SIZE:
+            return
+
+def write_inserts(fout, insert_prefix, rows):
+    # rows เป็นบรรทัด COPY แบบ bytes ใช้ copy_codec แปลงเป็น VALUES ทั้ง batch
+    insert_suffix = b');\n'
+    values = sql_values_rows(rows)
+    fout.write(insert_prefix + (insert_suffix + insert_prefix).join(values) + insert_suffix)
 
 def convert_copy_to_insert(input_path, output_path):
-    with open(input_path, encoding='utf-8') as fin, open(output_path, 'w', encoding='utf-8') as fout:
-        in_copy = False
-        table = None
-        columns = []
-        rows = []
-        for line in fin:
-            line = line.rstrip('\n')
-            if not in_copy:
-                table, columns = parse_copy_line(line)
-                if table:
-                    in_copy = True
-                    rows = []
-                continue
-            if line == r'\.':
-                # write INSERTs
-                if table and columns:
-                    for row in rows:
-                        values = ', '.join(sql_value(val) for val in row)
-                        fout.write(f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({values});\n')
-                in_copy = False
+    # อ่าน/เขียนแบบ bytes เพื่อไม่ต้อง decode/encode UTF-8 ทุกแถว
+    with open(input_path, 'rb') as fin, open(output_path, 'wb') as fout:
+        for line in iter(fin.readline, b''):
+            table, columns = parse_copy_line(line.decode('utf-8'))
+            if not table:
                 continue
-            # in copy data
-            row = line.split('\t')
-            rows.append(row)
+            # write INSERTs
+            insert_prefix = f'INSERT INTO {table} ({", ".join(columns)}) VALUES ('.encode('utf-8')
+            for rows in read_copy_batches(fin):
+                write_inserts(fout, insert_prefix, rows)
 
 if __name__ == '__main__':
     convert_copy_to_insert(
         'blueledgers.backup.sql',  # ไฟล์ input
         'blueledgers_insert.sql'   # ไฟล์ output
-    )
\ No newline at end of file
+    )
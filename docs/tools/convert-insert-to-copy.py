@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+แปลงไฟล์ SQL ที่เป็น INSERT ทีละแถว ให้เป็น COPY ... FROM stdin
+เพื่อให้ psql โหลดข้อมูลได้เร็วขึ้นมาก (กลับด้านกับ convert-copy-to-insert.py)
+
+ขั้นตอน:
+  1. อ่านไฟล์แบบ streaming แยกทีละ statement และเก็บ INSERT ของแต่ละตาราง
+     ลงไฟล์ชั่วคราว (spool) โดยรักษาลำดับเทียบกับ statement อื่น (SET, setval ฯลฯ)
+  2. parse ค่า literal และเขียนเป็นแถว COPY แบบขนานข้ามตาราง
+  3. ต่อผลลัพธ์ทั้งหมดตามลำดับเดิม
+
+INSERT ที่แปลงไม่ได้ (เช่น มี function call หรือ DEFAULT) จะคงไว้แบบเดิมในตำแหน่งเดิม
+โดยปิด COPY block ก่อนหน้าแล้วเริ่ม block ใหม่ต่อจากนั้น ส่วน INSERT ... SELECT / ON CONFLICT / RETURNING
+และ statement อื่นๆ จะถูกคัดลอกไปตามเดิมทุกตัวอักษร
+"""
+
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from copy_codec import encode_field
+
+READ_SIZE = 1024 * 1024
+# จำนวนตัวอักษรท้าย buffer ที่ต้องสแกนซ้ำ เผื่อ token ถูกตัดกลางระหว่างการอ่าน (เช่น "-" ของ "--")
+# ต้องยาวกว่า dollar-quote tag ที่ยาวที่สุด (identifier ยาวได้ 63 ตัวอักษร)
+SCAN_LOOKBACK = 128
+
+IDENT = r'(?:"(?:[^"]|"")*"|[A-Za-z_][\w$]*)'
+SKIP_LEADING_RE = re.compile(r'(?:\s+|--[^\n]*(?:\n|$)|/\*.*?\*/)*', re.S)
+INSERT_HEADER_RE = re.compile(
+    SKIP_LEADING_RE.pattern +
+    rf'INSERT\s+INTO\s+(?P<table>{IDENT}(?:\s*\.\s*{IDENT})?)\s*'
+    rf'(?:\((?P<columns>\s*{IDENT}(?:\s*,\s*{IDENT})*\s*)\)\s*)?'
+    r'VALUES\s*(?=\()',
+    re.I | re.S
+)
+# INSERT ที่มีความหมายเพิ่มจากการใส่แถวธรรมดา ต้องรักษาลำดับไว้ จึงไม่นำไปรวมกลุ่ม
+NON_PLAIN_INSERT_RE = re.compile(r'\bON\s+CONFLICT\b|\bRETURNING\b', re.I)
+STANDARD_STRINGS_RE = re.compile(
+    r"SET\s+(?:SESSION\s+|LOCAL\s+)?standard_conforming_strings\s*(?:=|TO)\s*'?(on|off)'?",
+    re.I
+)
+
+# tag ของ dollar quote ใช้กฎเดียวกับ identifier เช่น $$, $body$, $fn1$
+DOLLAR_TAG = r'(?:[A-Za-z_\x80-\uffff][\w\x80-\uffff]*)?'
+
+# token สำหรับแยก statement
+SPECIAL_RE = re.compile(rf"""[;'"]|--|/\*|\${DOLLAR_TAG}\$|(?<![\w$])[Ee]'""")
+STD_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+BACKSLASH_STRING_RE = re.compile(r"[Ee]?'(?:[^'\\]|''|\\.)*'", re.S)
+QUOTED_IDENT_RE = re.compile(r'"(?:[^"]|"")*"')
+# fast path: statement ทั้งก้อนที่ไม่มี comment, E'...' หรือ dollar quote จับได้ด้วย regex เดียว
+# ทุกทางเลือกต้องอ่านได้แบบเดียวเท่านั้น เพราะถ้าไม่เจอ ; (statement ถูกตัดที่ขอบ buffer หรือท้ายไฟล์)
+# regex จะลองทุกวิธีอ่าน เช่น 'a''b' ต้องเป็น string เดียว ไม่ใช่ 'a' ต่อด้วย 'b'
+# จึงห้ามจบ string / identifier หน้า quote ตัวถัดไป (?!') ไม่เช่นนั้นจะเกิด backtracking แบบ exponential
+FAST_STATEMENT_PATTERN = r"""(?:[^;'"\-/$Ee]|{string}(?!')|"[^"]*(?:""[^"]*)*"(?!")|[Ee](?!')|-(?!-)|/(?!\*)|\$(?!{tag}\$))*;"""
+FAST_STATEMENT_RE = {
+    True: re.compile(FAST_STATEMENT_PATTERN.format(string=r"'[^']*(?:''[^']*)*'", tag=DOLLAR_TAG)),
+    False: re.compile(FAST_STATEMENT_PATTERN.format(string=r"'[^'\\]*(?:(?:''|\\.)[^'\\]*)*'", tag=DOLLAR_TAG), re.S)
+}
+
+# token สำหรับ parse ค่าใน VALUES (แยกตามค่า standard_conforming_strings)
+VALUE_TOKEN_PATTERN = r"""
+    \s*(?:
+        (?P<estr>(?<![\w$])[Ee]'(?:[^'\\]|''|\\.)*')
+      | (?P<str>{string})
+      | (?P<num>[-+]?(?:\d+\.?\d*|\.\d+)(?:[Ee][-+]?\d+)?)(?![\w$.])
+      | (?P<null>NULL)(?![\w$])
+      | (?P<true>TRUE)(?![\w$])
+      | (?P<false>FALSE)(?![\w$])
+    )
+    \s*(?P<cast>(?:::(?:\s*(?:"(?:[^"]|"")*"|[\w$.]+|\(\s*\d+(?:\s*,\s*\d+)?\s*\)|\[\s*\]))+\s*)*)
+    (?P<sep>[,)])
+"""
+VALUE_TOKEN_RE = {
+    True: re.compile(VALUE_TOKEN_PATTERN.format(string=r"'(?:[^']|'')*'"), re.X | re.I | re.S),
+    False: re.compile(VALUE_TOKEN_PATTERN.format(string=r"'(?:[^'\\]|''|\\.)*'"), re.X | re.I | re.S)
+}
+INTEGER_RE = re.compile(r'[-+]?\d+')
+SIMPLE_CAST_RE = re.compile(r'::\s*(?:"(?:[^"]|"")*"|[\w$.]+)(?:\s*\[\s*\])*\s*')
+ROW_START_RE = re.compile(r'\s*\(')
+ROW_SEP_RE = re.compile(r'\s*(?:(?P<comma>,)|(?P<end>;?\s*$))', re.S)
+
+E_ESCAPE_RE = re.compile(r"''|\\(?:([0-7]{1,3})|x([0-9A-Fa-f]{1,2})|u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))", re.S)
+E_SIMPLE_ESCAPES = {'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+SPOOL_SEPARATOR = '\0'  # PostgreSQL ไม่อนุญาตให้มี NUL ใน text จึงใช้คั่น statement ได้
+
+class UnsupportedStatement(Exception):
+    """INSERT ที่แปลงเป็น COPY ไม่ได้ ต้องคงไว้แบบเดิม"""
+
+class StatementSplitter:
+    """
+    แยก SQL เป็นทีละ statement แบบ streaming โดยไม่ตัดกลาง string literal,
+    quoted identifier, comment หรือ dollar-quoted string
+    """
+
+    def __init__(self, fin):
+        self.fin = fin
+        # ต้องอัปเดตเมื่อเจอ SET standard_conforming_strings เพราะมีผลต่อการอ่าน '...'
+        self.standard_conforming_strings = True
+
+    def _string_re(self):
+        return STD_STRING_RE if self.standard_conforming_strings else BACKSLASH_STRING_RE
+
+    def _find_end(self, buf, m, eof):
+        """หาตำแหน่งสิ้นสุดของ token ที่เริ่มที่ m คืน None ถ้าต้องอ่านข้อมูลเพิ่ม"""
+        token = m.group()
+        start = m.start()
+        if token in ("'", "E'", "e'"):
+            string_re = self._string_re() if token == "'" else BACKSLASH_STRING_RE
+            end_m = string_re.match(buf, start)
+            # '' ท้าย buffer อาจเป็น quote ซ้อนที่ยังอ่านไม่ครบ
+            if end_m and (end_m.end() < len(buf) or eof):
+                return end_m.end()
+            return len(buf) if eof else None
+        if token == '"':
+            end_m = QUOTED_IDENT_RE.match(buf, start)
+            if end_m and (end_m.end() < len(buf) or eof):
+                return end_m.end()
+            return len(buf) if eof else None
+        if token == '--':
+            end = buf.find('\n', start)
+            if end == -1:
+                return len(buf) if eof else None
+            return end + 1
+        if token == '/*':
+            end = buf.find('*/', start + 2)
+            if end == -1:
+                return len(buf) if eof else None
+            return end + 2
+        # dollar-quoted string เช่น $$...$$ หรือ $body$...$body$
+        end = buf.find(token, m.end())
+        if end == -1:
+            return len(buf) if eof else None
+        return end + len(token)
+
+    def __iter__(self):
+        buf = ''
+        start = 0  # จุดเริ่มของ statement ปัจจุบัน
+        pos = 0    # ตำแหน่งที่สแกนถึง
+        eof = False
+        while not eof:
+            chunk = self.fin.read(READ_SIZE)
+            if chunk:
+                buf = buf[start:] + chunk
+                pos -= start
+                start = 0
+            else:
+                eof = True
+
+            while True:
+                if pos == start:
+                    m = FAST_STATEMENT_RE[self.standard_conforming_strings].match(buf, pos)
+                    if m:
+                        pos = start = m.end()
+                        yield m.group()
+                        continue
+                m = SPECIAL_RE.search(buf, pos)
+                if not m:
+                    pos = len(buf) if eof else max(pos, len(buf) - SCAN_LOOKBACK)
+                    break
+                if m.group() == ';':
+                    pos = m.end()
+                    yield buf[start:pos]
+                    start = pos
+                    continue
+                end = self._find_end(buf, m, eof)
+                if end is None:
+                    pos = m.start()
+                    break
+                pos = end
+
+        if buf[start:].strip():
+            yield buf[start:]
+
+def strip_leading(statement):
+    """ตัด whitespace และ comment หน้า statement"""
+    return statement[SKIP_LEADING_RE.match(statement).end():]
+
+def normalize_columns(columns):
+    """จัดรูปแบบรายชื่อคอลัมน์ให้เป็นมาตรฐานเดียวกัน (ใช้เป็น key ของกลุ่ม)"""
+    if columns is None:
+        return None
+    return ', '.join(col.strip() for col in re.findall(rf'\s*({IDENT})\s*(?:,|$)', columns))
+
+def decode_escape_string(body):
+    """
+    แปลงเนื้อหาของ E'...' (ไม่รวม quote) เป็นข้อความจริง
+    ค่า octal (\\ooo) และ hex (\\xhh) เป็นค่า byte จึงต้องประกอบเป็น UTF-8 ก่อน decode
+    """
+    out = bytearray()
+    pos = 0
+    for m in E_ESCAPE_RE.finditer(body):
+        out += body[pos:m.start()].encode('utf-8')
+        pos = m.end()
+        octal, hex_code, short_u, long_u, char = m.groups()
+        if m.group() == "''":
+            out += b"'"
+        elif octal:
+            out.append(int(octal, 8) & 0xFF)
+        elif hex_code:
+            out.append(int(hex_code, 16))
+        elif short_u or long_u:
+            out += chr(int(short_u or long_u, 16)).encode('utf-8')
+        else:
+            out += E_SIMPLE_ESCAPES.get(char, char).encode('utf-8')
+    out += body[pos:].encode('utf-8')
+
+    try:
+        return out.decode('utf-8')
+    except UnicodeDecodeError:
+        raise UnsupportedStatement(body[:40])
+
+def parse_values(values_sql, standard_conforming_strings=True):
+    """
+    parse ส่วน VALUES (...), (...) คืนรายการแถวในรูปแบบ COPY text
+    raise UnsupportedStatement ถ้ามีค่าที่ไม่ใช่ literal
+    """
+    value_token_re = VALUE_TOKEN_RE[standard_conforming_strings]
+    rows = []
+    pos = 0
+    length = len(values_sql)
+    while True:
+        m = ROW_START_RE.match(values_sql, pos)
+        if not m:
+            raise UnsupportedStatement(values_sql[pos:pos + 40])
+        pos = m.end()
+
+        fields = []
+        while True:
+            m = value_token_re.match(values_sql, pos)
+            if not m:
+                raise UnsupportedStatement(values_sql[pos:pos + 40])
+            pos = m.end()
+
+            cast = m.group('cast')
+            if cast and m.group('null') is None:
+                # ยอมให้แค่ cast ชั้นเดียวที่ไม่มี typmod บน string (เช่น '{}'::jsonb) ซึ่งถือว่าตรงกับชนิดของคอลัมน์
+                # cast ที่มี typmod หรือหลายชั้น (เช่น '1.239'::numeric(5,2), 'abc'::varchar(2)) และ cast ของตัวเลข
+                # (เช่น 1.5::integer) เปลี่ยนค่าได้ ให้ผลต่างจากการอ่านข้อความใน COPY
+                is_string = m.group('estr') is not None or m.group('str') is not None
+                if not is_string or not SIMPLE_CAST_RE.fullmatch(cast):
+                    raise UnsupportedStatement(m.group().strip())
+
+            if m.group('estr') is not None:
+                fields.append(encode_field(decode_escape_string(m.group('estr')[2:-1])))
+            elif m.group('str') is not None:
+                body = m.group('str')[1:-1]
+                if standard_conforming_strings:
+                    fields.append(encode_field(body.replace("''", "'")))
+                else:
+                    fields.append(encode_field(decode_escape_string(body)))
+            elif m.group('null') is not None:
+                fields.append('\\N')
+            elif m.group('num') is not None:
+                number = m.group('num')
+                # INSERT ใส่ค่าที่คำนวณแล้ว (+5 หรือ 007 ในคอลัมน์ text จะได้ '5' / '7')
+                if number[0] in '+0' or number.startswith('-0'):
+                    if INTEGER_RE.fullmatch(number):
+                        number = str(int(number))
+                fields.append(number)
+            elif m.group('true') is not None:
+                # ใช้ true/false แทน t/f เพราะ INSERT TRUE ลงคอลัมน์ text ได้ค่า 'true'
+                fields.append('true')
+            else:
+                fields.append('false')
+
+            if m.group('sep') == ')':
+                break
+
+        rows.append('\t'.join(fields))
+
+        m = ROW_SEP_RE.match(values_sql, pos)
+        if not m:
+            raise UnsupportedStatement(values_sql[pos:pos + 40])
+        if m.group('end') is not None:
+            return rows
+        pos = m.end()
+        if pos >= length:
+            raise UnsupportedStatement(values_sql[pos:pos + 40])
+
+def read_spool(spool_path):
+    """อ่าน statement จากไฟล์ spool ทีละตัวโดยไม่โหลดทั้งไฟล์เข้า memory"""
+    with open(spool_path, encoding='utf-8', newline='') as f:
+        pending = ''
+        while True:
+            chunk = f.read(READ_SIZE)
+            if not chunk:
+                break
+            parts = (pending + chunk).split(SPOOL_SEPARATOR)
+            pending = parts.pop()
+            yield from parts
+
+def write_group(spool_path, output_path, table, columns, standard_conforming_strings, field_count=None):
+    """
+    เขียน COPY block ของตารางหนึ่งจากไฟล์ spool
+    ถ้าระบุ field_count แถวที่มีจำนวนคอลัมน์ไม่ตรงจะคงไว้เป็น INSERT เดิม
+    คืนค่า (จำนวนแถวที่แปลงได้, จำนวน statement ที่คงไว้แบบเดิม, set ของจำนวนคอลัมน์ที่พบ)
+    """
+    column_sql = f' ({columns})' if columns is not None else ''
+    row_count = 0
+    fallback_count = 0
+    field_counts = set()
+    with open(output_path, 'w', encoding='utf-8', newline='') as fout:
+        in_copy = False
+        for values_sql in read_spool(spool_path):
+            try:
+                rows = parse_values(values_sql, standard_conforming_strings)
+                if columns is None:
+                    # tab ในค่าถูก escape เป็น \t แล้ว tab จริงจึงเป็นตัวคั่นคอลัมน์เท่านั้น
+                    row_field_counts = {row.count('\t') + 1 for row in rows}
+                    field_counts |= row_field_counts
+                    if field_count is not None and row_field_counts != {field_count}:
+                        raise UnsupportedStatement(values_sql[:40])
+            except UnsupportedStatement:
+                # ปิด COPY block ก่อนแล้วค่อยเขียน INSERT เดิม เพื่อรักษาลำดับแถว
+                # (self-referencing FK หรือค่า serial อาจขึ้นกับลำดับ)
+                if in_copy:
+                    fout.write('\\.\n')
+                    in_copy = False
+                statement = f'INSERT INTO {table}{column_sql} VALUES {values_sql.strip()}'
+                fout.write(statement if statement.endswith(';') else statement + ';')
+                fout.write('\n')
+                fallback_count += 1
+                continue
+            if not in_copy:
+                fout.write(f'COPY {table}{column_sql} FROM stdin;\n')
+                in_copy = True
+            fout.write('\n'.join(rows))
+            fout.write('\n')
+            row_count += len(rows)
+
+        if in_copy:
+            fout.write('\\.\n')
+
+    return row_count, fallback_count, field_counts
+
+def convert_group(spool_path, output_path, table, columns, standard_conforming_strings):
+    """
+    แปลง INSERT ทั้งหมดของตารางหนึ่งเป็น COPY block (รันใน worker process)
+    คืนค่า (จำนวนแถวที่แปลงได้, จำนวน statement ที่คงไว้แบบเดิม)
+    """
+    row_count, fallback_count, field_counts = write_group(
+        spool_path, output_path, table, columns, standard_conforming_strings
+    )
+    if len(field_counts) > 1:
+        # INSERT ที่ไม่มีรายชื่อคอลัมน์ใส่ค่าไม่ครบได้ (คอลัมน์ท้ายใช้ค่า default) แต่ COPY ต้องมีครบทุกคอลัมน์
+        # จึงเขียนใหม่โดยแปลงเฉพาะแถวที่มีจำนวนคอลัมน์มากที่สุด ที่เหลือคงไว้เป็น INSERT เดิม
+        row_count, fallback_count, _ = write_group(
+            spool_path, output_path, table, columns, standard_conforming_strings, max(field_counts)
+        )
+
+    os.unlink(spool_path)
+    return row_count, fallback_count
+
+class InsertToCopyConverter:
+    """รวม INSERT ของแต่ละตารางเป็นกลุ่ม แล้วส่งให้ worker แปลงแบบขนาน"""
+
+    def __init__(self, executor, temp_dir):
+        self.executor = executor
+        self.temp_dir = temp_dir
+        self.items = []   # ผลลัพธ์ตามลำดับ: ('raw', text) หรือ ('group', future, output_path)
+        self.groups = {}  # (table, columns, standard_conforming_strings) -> spool file
+        self.group_counter = 0
+
+    def add_raw(self, statement):
+        """statement ที่ต้องคัดลอกไปตามเดิม ทำหน้าที่เป็นขอบเขตของการรวมกลุ่มด้วย"""
+        self.flush_groups()
+        self.items.append(('raw', statement))
+
+    def add_insert(self, key, values_sql):
+        """เพิ่ม INSERT เข้ากลุ่มของตาราง"""
+        spool = self.groups.get(key)
+        if spool is None:
+            self.group_counter += 1
+            path = os.path.join(self.temp_dir, f'group_{self.group_counter}.spool')
+            spool = open(path, 'w', encoding='utf-8', newline='')
+            self.groups[key] = spool
+        spool.write(values_sql)
+        spool.write(SPOOL_SEPARATOR)
+
+    def flush_groups(self):
+        """ส่งกลุ่มที่สะสมไว้ให้ worker แปลง ตามลำดับที่ตารางปรากฏครั้งแรก"""
+        for (table, columns, standard_conforming_strings), spool in self.groups.items():
+            spool.close()
+            output_path = spool.name[:-len('.spool')] + '.copy'
+            future = self.executor.submit(
+                convert_group, spool.name, output_path, table, columns, standard_conforming_strings
+            )
+            self.items.append(('group', future, output_path))
+        self.groups = {}
+
+    def write_output(self, fout):
+        """ต่อผลลัพธ์ทั้งหมดลงไฟล์ output ตามลำดับเดิม"""
+        self.flush_groups()
+        total_rows = 0
+        total_fallbacks = 0
+        for item in self.items:
+            if item[0] == 'raw':
+                fout.write(item[1])
+                continue
+            _, future, output_path = item
+            row_count, fallback_count = future.result()
+            total_rows += row_count
+            total_fallbacks += fallback_count
+            fout.write('\n')
+            with open(output_path, encoding='utf-8', newline='') as fin:
+                shutil.copyfileobj(fin, fout, READ_SIZE)
+            os.unlink(output_path)
+        fout.write('\n')
+        return total_rows, total_fallbacks
+
+def convert_insert_to_copy(input_path, output_path, jobs=None, temp_dir=None):
+    """แปลงไฟล์ INSERT เป็น COPY คืนค่า (จำนวนแถวที่แปลง, จำนวน INSERT ที่คงไว้แบบเดิม)"""
+    with tempfile.TemporaryDirectory(prefix='insert-to-copy-', dir=temp_dir) as spool_dir, \
+            ProcessPoolExecutor(max_workers=jobs) as executor, \
+            open(input_path, encoding='utf-8', newline='') as fin, \
+            open(output_path, 'w', encoding='utf-8', newline='') as fout:
+        converter = InsertToCopyConverter(executor, spool_dir)
+        splitter = StatementSplitter(fin)
+
+        group_keys = {}
+        for statement in splitter:
+            m = INSERT_HEADER_RE.match(statement)
+            if not m or NON_PLAIN_INSERT_RE.search(statement, m.end()):
+                setting = STANDARD_STRINGS_RE.match(strip_leading(statement))
+                if setting:
+                    splitter.standard_conforming_strings = setting.group(1).lower() == 'on'
+                converter.add_raw(statement)
+                continue
+
+            header = (m.group('table'), m.group('columns'), splitter.standard_conforming_strings)
+            key = group_keys.get(header)
+            if key is None:
+                key = (re.sub(r'\s*\.\s*', '.', header[0]), normalize_columns(header[1]), header[2])
+                group_keys[header] = key
+            converter.add_insert(key, statement[m.end():])
+
+        return converter.write_output(fout)
+
+def main():
+    """ฟังก์ชันหลัก"""
+    parser = argparse.ArgumentParser(description='แปลง SQL แบบ INSERT ทีละแถวเป็น COPY ... FROM stdin')
+    parser.add_argument('input', help='ไฟล์ SQL ที่มี INSERT')
+    parser.add_argument('output', help='ไฟล์ SQL ผลลัพธ์ที่ใช้ COPY')
+    parser.add_argument('--jobs', type=int, default=None, help='จำนวน process ที่ใช้แปลง (default: จำนวน CPU)')
+    parser.add_argument('--temp-dir', default=None, help='โฟลเดอร์สำหรับไฟล์ชั่วคราว')
+    args = parser.parse_args()
+
+    print(f"🔄 แปลง {args.input} -> {args.output}")
+    started = time.monotonic()
+    try:
+        row_count, fallback_count = convert_insert_to_copy(args.input, args.output, args.jobs, args.temp_dir)
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"❌ แปลงไฟล์ล้มเหลว: {e}")
+        sys.exit(1)
+
+    print(f"✅ แปลงสำเร็จ {row_count:,} แถว ใน {time.monotonic() - started:.1f} วินาที")
+    if fallback_count:
+        print(f"⚠️  มี INSERT {fallback_count:,} statement ที่แปลงไม่ได้ จึงคงไว้แบบเดิม")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+COPY text format codec
+decode / encode แถวข้อมูลในรูปแบบ COPY ... FROM stdin (text format, delimiter = tab)
+ใช้ร่วมกันระหว่าง convert-copy-to-insert.py, convert-insert-to-copy.py และ restore tooling
+
+รูปแบบ (ตาม PostgreSQL COPY text format):
+  - คอลัมน์คั่นด้วย tab แถวคั่นด้วย newline
+  - \\N คือ NULL
+  - \\b \\f \\n \\r \\t \\v และ \\\\ แทนตัวอักษรพิเศษ
+  - \\ooo (octal 1-3 หลัก) และ \\xhh (hex 1-2 หลัก) แทนค่า byte ใน encoding ของไฟล์ (UTF-8)
+  - backslash ตามด้วยตัวอักษรอื่นแทนตัวอักษรนั้นเอง
+
+ทุกฟังก์ชันมี fast path สำหรับแถวที่ backslash มีแค่ใน \\N (ส่วนใหญ่ของข้อมูลจริง)
+ซึ่งทำงานด้วย string method ระดับบรรทัดทั้งหมด ไม่ต้องวน loop ทีละคอลัมน์ใน Python
+ดูผล benchmark ได้ด้วย: python3 copy_codec.py --benchmark
+"""
+
+import argparse
+import re
+import sys
+import time
+
+NULL_MARKER = '\\N'
+END_OF_DATA = '\\.'
+
+ESCAPE_RE = re.compile(r'\\(?:([0-7]{1,3})|x([0-9A-Fa-f]{1,2})|(.))', re.S)
+SIMPLE_ESCAPES = {
+    'b': '\b',
+    'f': '\f',
+    'n': '\n',
+    'r': '\r',
+    't': '\t',
+    'v': '\v'
+}
+# escape ที่ได้ผลเป็นตัวอักษรเดียว ไม่ต้องประกอบ byte
+TEXT_ESCAPE_RE = re.compile(r'\\(.)', re.S)
+BYTE_ESCAPE_RE = re.compile(r'\\(?:[0-7]|x[0-9A-Fa-f])')
+COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+    '\b': '\\b',
+    '\f': '\\f',
+    '\v': '\\v'
+})
+# ใช้กับ map(dict.get, fields, fields) เพื่อแปลง \N เป็น None โดยไม่ต้องวน loop ใน Python
+NULL_DECODING = {NULL_MARKER: None}
+# เวอร์ชัน bytes สำหรับ sql_values
+BYTES_TEXT_ESCAPE_RE = re.compile(rb'\\(.)', re.S)
+BYTES_BYTE_ESCAPE_RE = re.compile(rb'\\(?:[0-7]|x[0-9A-Fa-f])')
+BYTES_SIMPLE_ESCAPES = {key.encode(): value.encode() for key, value in SIMPLE_ESCAPES.items()}
+# คอลัมน์ที่อาจมี backslash ตามด้วย tab จริง (PostgreSQL อ่านเป็นตัว tab ในข้อมูล ไม่ใช่ตัวคั่น)
+ESCAPED_FIELD_RE = re.compile(r'((?:[^\t\\]|\\.)*\\?)(\t|$)', re.S)
+
+class CopyFormatError(ValueError):
+    """ข้อมูลไม่ถูกต้องตามรูปแบบ COPY text"""
+
+def _replace_text_escape(m):
+    char = m.group(1)
+    return SIMPLE_ESCAPES.get(char, char)
+
+def _decode_byte_escapes(field):
+    """decode field ที่มี \\ooo หรือ \\xhh ซึ่งต้องประกอบ byte เป็น UTF-8"""
+    out = bytearray()
+    pos = 0
+    for m in ESCAPE_RE.finditer(field):
+        out += field[pos:m.start()].encode('utf-8')
+        pos = m.end()
+        octal, hex_code, char = m.groups()
+        if octal:
+            out.append(int(octal, 8) & 0xFF)
+        elif hex_code:
+            out.append(int(hex_code, 16))
+        else:
+            out += SIMPLE_ESCAPES.get(char, char).encode('utf-8')
+    out += field[pos:].encode('utf-8')
+
+    try:
+        return out.decode('utf-8')
+    except UnicodeDecodeError as e:
+        raise CopyFormatError(f"byte escape ไม่ใช่ UTF-8 ที่ถูกต้อง: {field[:40]!r}") from e
+
+def decode_field(field):
+    """decode ค่าหนึ่งคอลัมน์ คืน None ถ้าเป็น NULL"""
+    if field == NULL_MARKER:
+        return None
+    if '\\' not in field:
+        return field
+    if field.endswith('\\') and (len(field) - len(field.rstrip('\\'))) % 2:
+        raise CopyFormatError(f"backslash ท้ายคอลัมน์: {field[-40:]!r}")
+    if BYTE_ESCAPE_RE.search(field):
+        return _decode_byte_escapes(field)
+    return TEXT_ESCAPE_RE.sub(_replace_text_escape, field)
+
+def _replace_bytes_escape(m):
+    char = m.group(1)
+    return BYTES_SIMPLE_ESCAPES.get(char, char)
+
+def _split_escaped(line):
+    """แยกคอลัมน์โดยไม่ตัดที่ tab ซึ่งถูก escape ด้วย backslash"""
+    fields = []
+    for m in ESCAPED_FIELD_RE.finditer(line):
+        fields.append(m.group(1))
+        if not m.group(2):
+            break
+    return fields
+
+def decode_row(line):
+    """
+    decode หนึ่งบรรทัดของ COPY (ไม่รวม newline ท้ายบรรทัด) เป็น list ของค่า
+    ค่า NULL จะเป็น None
+    """
+    fields = line.split('\t')
+    if '\\' not in line:
+        return fields  # fast path: ไม่มี escape และไม่มี NULL
+    backslashes = line.count('\\')
+    if backslashes == fields.count(NULL_MARKER):
+        return list(map(NULL_DECODING.get, fields, fields))  # fast path: มีแค่ NULL
+    if '\\\t' in line:
+        return [decode_field(field) for field in _split_escaped(line)]
+    return [decode_field(field) for field in fields]
+
+def decode_rows(lines):
+    """decode หลายบรรทัด (ไม่รวม newline) พร้อมกัน"""
+    return [
+        line.split('\t') if '\\' not in line else decode_row(line)
+        for line in lines
+    ]
+
+def encode_field(value):
+    """encode ค่าหนึ่งคอลัมน์ (None คือ NULL)"""
+    if value is None:
+        return NULL_MARKER
+    if not isinstance(value, str):
+        value = str(value)
+    return value.translate(COPY_ESCAPES)
+
+def encode_row(values):
+    """encode หนึ่งแถวเป็นบรรทัด COPY (ไม่รวม newline)"""
+    try:
+        text = ''.join([value for value in values if value is not None])
+    except TypeError:
+        text = None  # มีค่าที่ไม่ใช่ str (เช่น int) ต้องแปลงทีละคอลัมน์
+    # fast path: ตัวอักษรที่ต้อง escape ทั้งหมดเป็น non-printable ยกเว้น backslash
+    if text is not None and '\\' not in text and text.isprintable():
+        return '\t'.join([NULL_MARKER if value is None else value for value in values])
+    return '\t'.join([encode_field(value) for value in values])
+
+def encode_rows(rows):
+    """encode หลายแถวเป็นข้อความ COPY ที่มี newline ปิดท้ายทุกบรรทัด (เขียนลงไฟล์ได้ในครั้งเดียว)"""
+    if not rows:
+        return ''
+    return '\n'.join([encode_row(values) for values in rows]) + '\n'
+
+def sql_literal(value):
+    """แปลงค่าที่ decode แล้วเป็น SQL literal (สมมติ standard_conforming_strings = on)"""
+    if value is None:
+        return 'NULL'
+    return "'" + value.replace("'", "''") + "'"
+
+def sql_values(line):
+    """
+    แปลงบรรทัด COPY แบบ bytes (UTF-8, ไม่รวม newline) เป็นรายการ SQL literal
+    สำหรับ VALUES (...) ให้ผลเหมือน ', '.join(map(sql_literal, decode_row(line)))
+
+    ทำงานกับ bytes โดยตรงเพราะ tab, newline, backslash และ quote เป็น ASCII
+    ซึ่งไม่มีทางปรากฏใน multibyte sequence ของ UTF-8 จึงไม่ต้อง decode ข้อความไทย
+    """
+    if b'\\' not in line:
+        if b"'" in line:
+            line = line.replace(b"'", b"''")
+        return b"'" + line.replace(b'\t', b"', '") + b"'"
+    if b"'" not in line and b'\\\t' not in line:
+        # ไม่มี quote ในข้อมูล '\N' จึงเกิดได้จากคอลัมน์ที่เป็น \N ทั้งคอลัมน์เท่านั้น
+        values = (b"'" + line.replace(b'\t', b"', '") + b"'").replace(b"'\\N'", b'NULL')
+        if b'\\' not in values:
+            return values
+        # escape แบบตัวอักษรเดียว (\t, \n, \\ ฯลฯ) ใส่ลงใน SQL literal ได้ตรงๆ
+        if not BYTES_BYTE_ESCAPE_RE.search(values):
+            return BYTES_TEXT_ESCAPE_RE.sub(_replace_bytes_escape, values)
+    fields = decode_row(line.decode('utf-8'))
+    return ', '.join([sql_literal(value) for value in fields]).encode('utf-8')
+
+def sql_values_rows(lines):
+    """
+    แปลงหลายบรรทัด COPY แบบ bytes (ไม่รวม newline) เป็นรายการ SQL literal
+    fast path ของ sql_values ถูก inline ไว้ใน loop เพื่อลด overhead ของการเรียกฟังก์ชันต่อบรรทัด
+    """
+    result = []
+    append = result.append
+    for line in lines:
+        if b"'" not in line:
+            values = (b"'" + line.replace(b'\t', b"', '") + b"'").replace(b"'\\N'", b'NULL')
+            if b'\\' not in values:
+                append(values)
+                continue
+        append(sql_values(line))
+    return result
+
+def _naive_decode_row(line):
+    """วิธีเดิมของ convert-copy-to-insert.py ใช้เป็น baseline ในการ benchmark"""
+    return [val for val in line.split('\t')]
+
+def _naive_sql_values(row):
+    """วิธีเดิมของ convert-copy-to-insert.py ใช้เป็น baseline ในการ benchmark"""
+    return ', '.join('NULL' if val == r'\N' else "'" + val.replace("'", "''") + "'" for val in row)
+
+def _benchmark_lines(row_count):
+    """สร้างข้อมูลตัวอย่างคล้ายข้อมูล tenant จริง (ภาษาไทย, NULL, มี escape บางแถว)"""
+    lines = []
+    for i in range(row_count):
+        note = 'หมายเหตุ\\tบรรทัด 1\\nบรรทัด 2' if i % 20 == 0 else 'สินค้าทั่วไป'
+        created_by = '\\N' if i % 3 == 0 else 'a1b2c3d4-0000-4000-8000-00000000000' + str(i % 10)
+        lines.append('\t'.join([
+            f'{i:08d}-7f3e-4b2a-9c1d-5e6f7a8b9c0d',
+            f'PO-2024-{i:06d}',
+            f'ข้าวหอมมะลิ {i % 50} กิโลกรัม',
+            str(i * 12.5),
+            note,
+            created_by,
+            '2024-06-01 10:00:00+07'
+        ]))
+    return lines
+
+def run_benchmark(row_count, repeat):
+    """เปรียบเทียบความเร็ว decode + สร้าง SQL values ระหว่างวิธีเดิมกับ codec"""
+    lines = _benchmark_lines(row_count)
+    raw_lines = [line.encode('utf-8') for line in lines]
+
+    def measure(func):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    # วิธีเดิมอ่านไฟล์แบบ text จึงรวมเวลา decode UTF-8 ไว้ด้วยเพื่อให้เทียบกันได้
+    naive = measure(lambda: [_naive_sql_values(_naive_decode_row(line.decode('utf-8'))) for line in raw_lines])
+    codec = measure(lambda: sql_values_rows(raw_lines))
+    decode_only = measure(lambda: decode_rows(lines))
+    rows = decode_rows(lines)
+    encode_only = measure(lambda: encode_rows(rows))
+
+    print(f"📊 Benchmark {row_count:,} แถว (ค่าที่ดีที่สุดจาก {repeat} รอบ)")
+    print(f"   วิธีเดิม (split + generator):   {naive:.3f} วินาที ({row_count / naive:,.0f} แถว/วินาที)")
+    print(f"   copy_codec sql_values_rows:    {codec:.3f} วินาที ({row_count / codec:,.0f} แถว/วินาที)")
+    print(f"   copy_codec decode_rows:        {decode_only:.3f} วินาที ({row_count / decode_only:,.0f} แถว/วินาที)")
+    print(f"   copy_codec encode_rows:        {encode_only:.3f} วินาที ({row_count / encode_only:,.0f} แถว/วินาที)")
+
+def main():
+    """ฟังก์ชันหลัก"""
+    parser = argparse.ArgumentParser(description='COPY text format codec')
+    parser.add_argument('--benchmark', action='store_true', help='วัดความเร็ว decode / encode')
+    parser.add_argument('--rows', type=int, default=200000, help='จำนวนแถวที่ใช้ benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='จำนวนรอบที่ใช้ benchmark')
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        parser.print_help()
+        sys.exit(1)
+
+    run_benchmark(args.rows, args.repeat)
+
+if __name__ == '__main__':
+    main()
@@ -2,13 +2,25 @@
 """
 PostgreSQL Restore Script
 ใช้ไฟล์ .env สำหรับการตั้งค่าการเชื่อมต่อ
+รองรับทั้ง restore จากไฟล์ pg_dump และ point-in-time recovery (PITR)
+จาก base backup + WAL archive ที่สร้างโดย wal_archive.py
 """
 
 import os
 import subprocess
 import sys
+import tarfile
+import tempfile
+from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
+from wal_archive import (
+    build_wal_command,
+    get_archive_config,
+    list_base_backups,
+    quote_conf_value,
+    restore_partial_wal
+)
 
 def load_environment():
     """โหลดไฟล์ .env"""
@@ -45,6 +57,31 @@ def get_database_config():
 
     return config
 
+def get_pitr_config():
+    """ดึงการตั้งค่า point-in-time recovery จาก environment variables"""
+    config = {
+        'data_dir': Path(os.getenv('PITR_DATA_DIR', 'pitr_data')).resolve(),
+        'port': os.getenv('PITR_PORT', '5433')
+    }
+
+    return config
+
+def select_restore_mode():
+    """เลือกรูปแบบการ restore"""
+    print("\nเลือกรูปแบบการ restore:")
+    print("1. Restore จากไฟล์ pg_dump (.sql)")
+    print("2. Point-in-time recovery (base backup + WAL archive)")
+
+    try:
+        choice = input("เลือก (1-2): ").strip()
+        restore_modes = {
+            '1': 'dump',
+            '2': 'pitr'
+        }
+        return restore_modes.get(choice, 'dump')
+    except KeyboardInterrupt:
+        return None
+
 def list_backup_files():
     """แสดงรายการไฟล์ backup ที่มีอยู่"""
     backup_dir = Path("backups")
@@ -92,6 +129,42 @@ def confirm_restore(database_name):
     except KeyboardInterrupt:
         return False
 
+def is_insert_dump(backup_file_path, sample_lines=5000):
+    """ตรวจว่าไฟล์ backup เก็บข้อมูลเป็น INSERT ทีละแถว (ไม่ใช่ COPY) หรือไม่"""
+    has_insert = False
+    with open(backup_file_path, encoding='utf-8', errors='replace') as f:
+        for i, line in enumerate(f):
+            if i >= sample_lines:
+                break
+            if line.startswith('COPY '):
+                return False
+            if line.startswith('INSERT INTO '):
+                has_insert = True
+    return has_insert
+
+def convert_insert_dump(backup_file_path):
+    """แปลงไฟล์ INSERT เป็น COPY ด้วย convert-insert-to-copy.py คืน path ของไฟล์ชั่วคราว"""
+    converter = Path(__file__).resolve().with_name('convert-insert-to-copy.py')
+    fd, converted_path = tempfile.mkstemp(prefix=backup_file_path.stem + '_', suffix='.copy.sql')
+    os.close(fd)
+    converted_path = Path(converted_path)
+
+    result = subprocess.run([sys.executable, str(converter), str(backup_file_path), str(converted_path)])
+    if result.returncode != 0:
+        converted_path.unlink(missing_ok=True)
+        return None
+    return converted_path
+
+def confirm_convert_to_copy():
+    """ถามว่าจะแปลง INSERT เป็น COPY ก่อน restore หรือไม่"""
+    print("\nℹ️  ไฟล์นี้เก็บข้อมูลเป็น INSERT ทีละแถว ซึ่ง restore ได้ช้า")
+
+    try:
+        confirm = input("แปลงเป็น COPY ก่อน restore เพื่อให้เร็วขึ้น? (yes/no): ").strip().lower()
+        return confirm in ['yes', 'y', 'ใช่']
+    except KeyboardInterrupt:
+        return False
+
 def run_restore(config, backup_file_path):
     """รัน restore command"""
     
@@ -193,6 +266,158 @@ def create_database_if_not_exists(config):
         print(f"❌ เกิดข้อผิดพลาด: {e}")
         return False
 
+def parse_target_time(value):
+    """แปลงเวลาเป้าหมาย ถ้าไม่ระบุ timezone จะถือเป็นเวลาท้องถิ่น"""
+    try:
+        target_time = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+    if target_time.tzinfo is None:
+        target_time = target_time.astimezone()
+    return target_time
+
+def select_target_time():
+    """ถามเวลาที่ต้องการกู้ข้อมูลกลับไป"""
+    try:
+        value = input("\nกู้ข้อมูลถึงเวลา (YYYY-MM-DD HH:MM:SS[+07:00]): ").strip()
+    except KeyboardInterrupt:
+        print("❌ ยกเลิกการทำงาน")
+        return None
+
+    target_time = parse_target_time(value)
+    if not target_time:
+        print(f"❌ รูปแบบเวลาไม่ถูกต้อง: {value}")
+    return target_time
+
+def select_base_backup(base_backups, target_time):
+    """เลือก base backup ล่าสุดที่เสร็จก่อนเวลาเป้าหมาย"""
+    candidates = [backup for backup in base_backups if backup['finished_at'] <= target_time]
+    if not candidates:
+        print("❌ ไม่มี base backup ที่เสร็จก่อนเวลาที่ต้องการ")
+        return None
+
+    return candidates[-1]
+
+def extract_tar(tar_path, target_dir):
+    """แตกไฟล์ tar.gz ของ pg_basebackup"""
+    target_dir.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(tar_path, 'r:gz') as tar:
+        if hasattr(tarfile, 'tar_filter'):
+            tar.extractall(target_dir, filter='tar')
+        else:
+            tar.extractall(target_dir)
+
+def prepare_pitr_data_dir(base_backup, data_dir, target_time, wal_dir):
+    """เตรียม data directory สำหรับ point-in-time recovery"""
+    if data_dir.exists() and any(data_dir.iterdir()):
+        print(f"❌ โฟลเดอร์ {data_dir} ไม่ว่าง")
+        print("   กรุณาระบุ PITR_DATA_DIR ใหม่ หรือลบโฟลเดอร์เดิมก่อน")
+        return False
+
+    backup_path = base_backup['path']
+    print(f"📦 แตกไฟล์ base backup {backup_path.name} ไปที่ {data_dir}...")
+    extract_tar(backup_path / 'base.tar.gz', data_dir)
+    if (backup_path / 'pg_wal.tar.gz').exists():
+        extract_tar(backup_path / 'pg_wal.tar.gz', data_dir / 'pg_wal')
+
+    # segment สุดท้ายที่ pg_receivewal ยังเขียนไม่เสร็จ (ถ้ารัน wal_archive.py receive)
+    partial_wal = restore_partial_wal(wal_dir, data_dir / 'pg_wal')
+    if partial_wal:
+        print(f"🧾 ใช้ WAL ที่ stream ไว้ล่าสุด: {partial_wal}.partial")
+
+    tablespaces = [p.name for p in backup_path.glob('*.tar.gz') if p.name not in ('base.tar.gz', 'pg_wal.tar.gz')]
+    if tablespaces:
+        print(f"⚠️  พบ tablespace ที่ต้องแตกไฟล์เอง: {', '.join(tablespaces)}")
+
+    # PostgreSQL ไม่ยอม start ถ้า data directory เปิดสิทธิ์ให้ user อื่น
+    data_dir.chmod(0o700)
+
+    with open(data_dir / 'postgresql.auto.conf', 'a', encoding='utf-8') as f:
+        f.write("\n# point-in-time recovery (restore_postgres.py)\n")
+        f.write(f"restore_command = {quote_conf_value(build_wal_command('restore', wal_dir))}\n")
+        f.write(f"recovery_target_time = '{target_time.isoformat(sep=' ')}'\n")
+        f.write("recovery_target_action = 'promote'\n")
+        # ไม่ให้ instance ที่กู้ขึ้นมา archive WAL timeline ใหม่ปนกับ archive ของ production
+        f.write("archive_mode = off\n")
+
+    (data_dir / 'recovery.signal').touch()
+    return True
+
+def start_pitr_server(data_dir, port):
+    """start PostgreSQL บน data directory ที่เตรียมไว้เพื่อเริ่ม recovery"""
+    log_file = data_dir.with_name(data_dir.name + '.log')
+
+    cmd = [
+        'pg_ctl',
+        '--pgdata=' + str(data_dir),
+        '--log=' + str(log_file),
+        '--options=-p ' + port,
+        '--no-wait',
+        'start'
+    ]
+
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except FileNotFoundError:
+        print("❌ ไม่พบ pg_ctl command")
+        print(f"   start เองด้วย: pg_ctl -D {data_dir} -o '-p {port}' start")
+        return False
+
+    if result.returncode != 0:
+        print("❌ ไม่สามารถ start PostgreSQL ได้")
+        print(f"Error: {result.stderr}")
+        return False
+
+    print(f"✅ เริ่ม recovery บน port {port}")
+    print(f"📄 ดูความคืบหน้าที่ {log_file}")
+    print("   เมื่อพบ 'database system is ready to accept connections' แสดงว่า recovery เสร็จ")
+    return True
+
+def run_point_in_time_recovery():
+    """กู้ฐานข้อมูลกลับไป ณ เวลาที่กำหนดจาก base backup + WAL archive"""
+    archive_config = get_archive_config()
+    pitr_config = get_pitr_config()
+
+    base_backups = list_base_backups(archive_config['base_dir'])
+    if not base_backups:
+        print(f"❌ ไม่พบ base backup ใน {archive_config['base_dir']}")
+        print("   สร้างด้วย: python3 wal_archive.py base-backup")
+        return False
+
+    print("📁 Base backup ที่มีอยู่:")
+    for backup in base_backups:
+        finished = backup['finished_at'].astimezone().strftime('%Y-%m-%d %H:%M:%S %Z')
+        print(f"  - {backup['path'].name} (เสร็จเมื่อ {finished})")
+
+    target_time = select_target_time()
+    if not target_time:
+        return False
+
+    base_backup = select_base_backup(base_backups, target_time)
+    if not base_backup:
+        return False
+
+    print(f"\n🔄 เริ่ม point-in-time recovery...")
+    print(f"   Base backup: {base_backup['path'].name}")
+    print(f"   WAL archive: {archive_config['wal_dir']}")
+    print(f"   Target time: {target_time.isoformat(sep=' ')}")
+    print(f"   Data directory: {pitr_config['data_dir']}")
+
+    if not prepare_pitr_data_dir(base_backup, pitr_config['data_dir'], target_time, archive_config['wal_dir']):
+        return False
+
+    try:
+        start = input("\nstart PostgreSQL เพื่อเริ่ม recovery เลยหรือไม่? (yes/no): ").strip().lower()
+    except KeyboardInterrupt:
+        start = 'no'
+
+    if start in ['yes', 'y', 'ใช่']:
+        return start_pitr_server(pitr_config['data_dir'], pitr_config['port'])
+
+    print(f"📝 start เองด้วย: pg_ctl -D {pitr_config['data_dir']} -o '-p {pitr_config['port']}' start")
+    return True
+
 def main():
     """ฟังก์ชันหลัก"""
     print("🐘 PostgreSQL Restore Tool")
@@ -202,6 +427,20 @@ def main():
     if not load_environment():
         sys.exit(1)
     
+    # เลือกรูปแบบการ restore
+    restore_mode = select_restore_mode()
+    if not restore_mode:
+        print("❌ ยกเลิกการทำงาน")
+        sys.exit(1)
+    
+    if restore_mode == 'pitr':
+        if run_point_in_time_recovery():
+            print(f"\n🎉 เตรียม point-in-time recovery เสร็จสิ้น!")
+        else:
+            print("\n❌ Point-in-time recovery ล้มเหลว!")
+            sys.exit(1)
+        return
+    
     # ดึงการตั้งค่า
     config = get_database_config()
     if not config:
@@ -226,8 +465,20 @@ def main():
     if not create_database_if_not_exists(config):
         sys.exit(1)
     
+    # แปลง INSERT เป็น COPY ถ้าผู้ใช้ต้องการ
+    restore_file = backup_file
+    if is_insert_dump(backup_file) and confirm_convert_to_copy():
+        restore_file = convert_insert_dump(backup_file)
+        if not restore_file:
+            print("❌ แปลงไฟล์ไม่สำเร็จ")
+            sys.exit(1)
+    
     # รัน restore
-    success = run_restore(config, backup_file)
+    try:
+        success = run_restore(config, restore_file)
+    finally:
+        if restore_file != backup_file:
+            restore_file.unlink(missing_ok=True)
     
     if success:
         print(f"\n🎉 Restore เสร็จสิ้น!")
@@ -0,0 +1,66 @@
+"""
+ทดสอบ convert-copy-to-insert.py
+
+รัน: python3 -m pytest test_convert_copy_to_insert.py
+"""
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().with_name('convert-copy-to-insert.py')
+
+# ชื่อไฟล์มี "-" จึง import ตรงๆ ไม่ได้
+_spec = importlib.util.spec_from_file_location('convert_copy_to_insert', SCRIPT)
+converter = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(converter)
+
+DUMP = (
+    'SET client_encoding = \'UTF8\';\n'
+    'COPY "B01".tb_unit (id, name, note) FROM stdin;\n'
+    'a1\tกิโลกรัม\tแท็บ\\tและ\\nขึ้นบรรทัด\n'
+    'a2\tit\'s\t\\N\n'
+    '\\.\n'
+    'SELECT 1;\n'
+    'COPY public.tb_empty (id) FROM stdin;\n'
+    '\\.\n'
+    'COPY public.tb_num (a, b) FROM stdin;\n'
+    '1\t\\\\N\n'
+    '\\.\n'
+)
+
+EXPECTED = (
+    'INSERT INTO "B01".tb_unit (id, name, note) VALUES (\'a1\', \'กิโลกรัม\', \'แท็บ\tและ\nขึ้นบรรทัด\');\n'
+    'INSERT INTO "B01".tb_unit (id, name, note) VALUES (\'a2\', \'it\'\'s\', NULL);\n'
+    'INSERT INTO public.tb_num (a, b) VALUES (\'1\', \'\\N\');\n'
+)
+
+def convert(tmp_path, data):
+    input_path = tmp_path / 'input.sql'
+    output_path = tmp_path / 'output.sql'
+    input_path.write_bytes(data)
+    converter.convert_copy_to_insert(input_path, output_path)
+    return output_path.read_text(encoding='utf-8')
+
+def test_convert_lf_dump(tmp_path):
+    assert convert(tmp_path, DUMP.encode('utf-8')) == EXPECTED
+
+def test_convert_crlf_dump(tmp_path):
+    assert convert(tmp_path, DUMP.replace('\n', '\r\n').encode('utf-8')) == EXPECTED
+
+@pytest.mark.parametrize('ending', ['', '\n', '\n\\.', '\r\n\\.\r'])
+def test_convert_dump_without_trailing_terminator(tmp_path, ending):
+    data = 'COPY t (a) FROM stdin;\n1\n2' + ending
+    assert convert(tmp_path, data.encode('utf-8')) == (
+        "INSERT INTO t (a) VALUES ('1');\n"
+        "INSERT INTO t (a) VALUES ('2');\n"
+    )
+
+def test_convert_blocks_larger_than_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(converter, 'BATCH_SIZE', 3)
+    data = 'COPY t (a) FROM stdin;\r\n' + ''.join(f'{i}\r\n' for i in range(7)) + '\\.\r\nCOPY u (b) FROM stdin;\n9\n\\.\n'
+    assert convert(tmp_path, data.encode('utf-8')) == (
+        ''.join(f"INSERT INTO t (a) VALUES ('{i}');\n" for i in range(7))
+        + "INSERT INTO u (b) VALUES ('9');\n"
+    )
@@ -0,0 +1,157 @@
+"""
+ทดสอบ convert-insert-to-copy.py
+
+รัน: python3 -m pytest test_convert_insert_to_copy.py
+"""
+
+import importlib.util
+import io
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().with_name('convert-insert-to-copy.py')
+
+# ชื่อไฟล์มี "-" จึง import ตรงๆ ไม่ได้
+_spec = importlib.util.spec_from_file_location('convert_insert_to_copy', SCRIPT)
+converter = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(converter)
+
+def split(sql, read_size=None, monkeypatch=None):
+    if read_size:
+        monkeypatch.setattr(converter, 'READ_SIZE', read_size)
+    return list(converter.StatementSplitter(io.StringIO(sql)))
+
+def convert(tmp_path, sql):
+    """รันสคริปต์จริง (ใช้ process pool) แล้วคืนไฟล์ผลลัพธ์"""
+    input_path = tmp_path / 'input.sql'
+    output_path = tmp_path / 'output.sql'
+    input_path.write_text(sql, encoding='utf-8')
+    subprocess.run(
+        [sys.executable, str(SCRIPT), str(input_path), str(output_path), '--jobs', '2'],
+        capture_output=True, check=True
+    )
+    return output_path.read_text(encoding='utf-8')
+
+# --- StatementSplitter ---
+
+FUNCTION_SQL = (
+    "CREATE FUNCTION f() RETURNS void AS $fn1$ BEGIN PERFORM 1; "
+    "INSERT INTO log VALUES (1); END; $fn1$ LANGUAGE plpgsql;\n"
+)
+
+@pytest.mark.parametrize('tag', ['$$', '$body$', '$fn1$', '$_2$', '$ฟังก์ชัน$'])
+def test_splitter_keeps_dollar_quoted_body(tag):
+    sql = f"CREATE FUNCTION f() AS {tag} BEGIN PERFORM 1; END; {tag} LANGUAGE plpgsql;\nSELECT 1;"
+    assert split(sql) == [sql[:-len('\nSELECT 1;')], '\nSELECT 1;']
+
+@pytest.mark.parametrize('read_size', [1, 7, 64])
+def test_splitter_is_independent_of_read_size(read_size, monkeypatch):
+    long_tag = '$' + 't' * 63 + '$'
+    sql = (
+        "SET standard_conforming_strings = off;\n"
+        "INSERT INTO a VALUES ('it''s; \\' ;', E'x\\';');\n"
+        "-- comment ; here\n"
+        "/* block ; */ INSERT INTO \"b;\" VALUES ($$;$$);\n"
+        f"DO {long_tag} BEGIN NULL; END {long_tag};\n"
+        + FUNCTION_SQL
+        + "SELECT 1;"
+    )
+    assert split(sql, read_size, monkeypatch) == split(sql)
+    assert ''.join(split(sql)) == sql
+    assert len(split(sql)) == 7
+
+# statement ที่มี '' หรือ "" จำนวนมากแต่ไม่มี ; ในช่วงที่อ่าน เคยทำให้ regex ของ fast path ใช้เวลาแบบ exponential
+QUOTE_HEAVY_SQL = [
+    "INSERT INTO t VALUES (1, '" + "it''s " * 40 + "')",
+    'INSERT INTO "' + 'a""b' * 40 + '" VALUES (1)',
+    "SET standard_conforming_strings = off;\nINSERT INTO t VALUES ('" + "it''s \\' " * 40 + "')"
+]
+
+@pytest.mark.parametrize('sql', QUOTE_HEAVY_SQL)
+def test_splitter_quote_heavy_statement_without_semicolon(sql):
+    assert ''.join(split(sql)) == sql
+
+@pytest.mark.parametrize('sql', QUOTE_HEAVY_SQL)
+def test_splitter_quote_heavy_statement_at_read_boundary(sql, monkeypatch):
+    statements = split(sql + ';\nSELECT 1;', len(sql) // 2, monkeypatch)
+    assert ''.join(statements) == sql + ';\nSELECT 1;'
+    assert statements[-1] == '\nSELECT 1;'
+
+# --- end-to-end ---
+
+def test_dollar_quoted_function_is_not_converted(tmp_path):
+    output = convert(tmp_path, FUNCTION_SQL + "INSERT INTO log VALUES (2);\n")
+    assert FUNCTION_SQL.strip() in output
+    assert output.count('COPY log FROM stdin;') == 1
+    assert 'COPY log FROM stdin;\n2\n\\.\n' in output
+
+def test_unsupported_insert_keeps_row_order(tmp_path):
+    output = convert(tmp_path, (
+        "INSERT INTO item (id, parent_id) VALUES (1, NULL);\n"
+        "INSERT INTO item (id, parent_id) VALUES (now(), 1);\n"
+        "INSERT INTO item (id, parent_id) VALUES (2, 1);\n"
+        "INSERT INTO item (id, parent_id) VALUES (3, 2);\n"
+    ))
+    assert output.strip() == (
+        "COPY item (id, parent_id) FROM stdin;\n"
+        "1\t\\N\n"
+        "\\.\n"
+        "INSERT INTO item (id, parent_id) VALUES (now(), 1);\n"
+        "COPY item (id, parent_id) FROM stdin;\n"
+        "2\t1\n"
+        "3\t2\n"
+        "\\."
+    )
+
+# --- parse_values ---
+
+@pytest.mark.parametrize('values_sql, expected', [
+    ("(1, -2, 'a''b', NULL);", ['1\t-2\ta\'b\t\\N']),
+    ("(+5, 007, -0, 0)", ['5\t7\t0\t0']),
+    ("(TRUE, false)", ['true\tfalse']),
+    ("(1.50, 1e3, -.5)", ['1.50\t1e3\t-.5']),
+    ("('ก\tข\nค', E'\\\\x')", ['ก\\tข\\nค\t\\\\x']),
+    ("(1), (2)", ['1', '2']),
+    ("('{}'::jsonb, '{1,2}' :: int[], 'x'::\"MyType\", NULL::numeric(5,2))", ['{}\t{1,2}\tx\t\\N'])
+])
+def test_parse_values(values_sql, expected):
+    assert converter.parse_values(values_sql) == expected
+
+@pytest.mark.parametrize('values_sql', [
+    "(now())",
+    "(DEFAULT)",
+    "(1.5::integer)",
+    "(1) x",
+    "('1.239'::numeric(5,2))",
+    "('abc'::varchar(2))",
+    "('1.5'::numeric::integer)",
+    "(E'ab'::char(1)[])"
+])
+def test_parse_values_unsupported(values_sql):
+    with pytest.raises(converter.UnsupportedStatement):
+        converter.parse_values(values_sql)
+
+def test_insert_without_column_list_and_mixed_arity(tmp_path):
+    output = convert(tmp_path, (
+        "INSERT INTO t VALUES (1, 'a');\n"
+        "INSERT INTO t VALUES (2, 'b', 'x');\n"
+        "INSERT INTO t VALUES (3, 'c', 'y'), (4, 'd');\n"
+        "INSERT INTO t VALUES (5, 'e', 'z');\n"
+    ))
+    assert output.strip() == (
+        "INSERT INTO t VALUES (1, 'a');\n"
+        "COPY t FROM stdin;\n"
+        "2\tb\tx\n"
+        "\\.\n"
+        "INSERT INTO t VALUES (3, 'c', 'y'), (4, 'd');\n"
+        "COPY t FROM stdin;\n"
+        "5\te\tz\n"
+        "\\."
+    )
+
+def test_insert_without_column_list_and_same_arity(tmp_path):
+    output = convert(tmp_path, "INSERT INTO t VALUES (1, 'a\tb');\nINSERT INTO t VALUES (2, NULL);\n")
+    assert output.strip() == "COPY t FROM stdin;\n1\ta\\tb\n2\t\\N\n\\."
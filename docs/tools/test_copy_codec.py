@@ -0,0 +1,125 @@
+"""
+ทดสอบ copy_codec.py
+
+รัน: python3 -m pytest test_copy_codec.py
+"""
+
+import random
+
+import pytest
+
+from copy_codec import (
+    CopyFormatError,
+    decode_field,
+    decode_row,
+    decode_rows,
+    encode_field,
+    encode_row,
+    encode_rows,
+    sql_literal,
+    sql_values,
+    sql_values_rows
+)
+
+def expected_sql(line):
+    return ', '.join(map(sql_literal, decode_row(line))).encode('utf-8')
+
+# --- decode ---
+
+@pytest.mark.parametrize('line, expected', [
+    ('a1\tกิโลกรัม\tt', ['a1', 'กิโลกรัม', 't']),
+    ('\\N\tx\t\\N', [None, 'x', None]),
+    ('\\\\N', ['\\N']),
+    ('a\\Nb', ['aNb']),
+    ('แท็บ\\tและ\\nขึ้นบรรทัด\\r', ['แท็บ\tและ\nขึ้นบรรทัด\r']),
+    ('\\b\\f\\v\\\\', ['\b\f\v\\']),
+    ('\\340\\270\\201\\xe0\\xb8\\x82', ['กข']),
+    ('\\101\\x41\\7', ['AA\x07']),
+    ('\\q', ['q']),
+    ('', ['']),
+    ('\t', ['', ''])
+])
+def test_decode_row(line, expected):
+    assert decode_row(line) == expected
+
+def test_decode_row_backslash_followed_by_raw_tab():
+    # backslash ตามด้วย tab จริง คือตัว tab ในข้อมูล ไม่ใช่ตัวคั่นคอลัมน์
+    assert decode_row('ชื่อ\\\tสินค้า\t\\N') == ['ชื่อ\tสินค้า', None]
+    # backslash ที่ escape แล้ว (\\) ตามด้วย tab คือตัวคั่นคอลัมน์ตามปกติ
+    assert decode_row('a\\\\\tb') == ['a\\', 'b']
+
+def test_decode_field_rejects_trailing_backslash():
+    with pytest.raises(CopyFormatError):
+        decode_field('abc\\')
+    assert decode_field('abc\\\\') == 'abc\\'
+
+def test_decode_field_rejects_invalid_utf8_bytes():
+    with pytest.raises(CopyFormatError):
+        decode_field('\\340\\270')
+
+def test_decode_rows():
+    assert decode_rows(['a\tb', '\\N', 'ก\\tข']) == [['a', 'b'], [None], ['ก\tข']]
+
+# --- encode ---
+
+def test_encode_field():
+    assert encode_field(None) == '\\N'
+    assert encode_field('\\N') == '\\\\N'
+    assert encode_field(15) == '15'
+    assert encode_field('ก\tข\nค\r\\\b\f\v') == 'ก\\tข\\nค\\r\\\\\\b\\f\\v'
+
+def test_encode_row_and_rows():
+    assert encode_row(['สินค้า', None, 'a\tb', 1]) == 'สินค้า\t\\N\ta\\tb\t1'
+    assert encode_row(['ก', None, 'ข']) == 'ก\t\\N\tข'
+    assert encode_rows([['a'], [None, 'ก\nข']]) == 'a\n\\N\tก\\nข\n'
+    assert encode_rows([]) == ''
+
+@pytest.mark.parametrize('values', [
+    ['ภาษาไทย\tมีแท็บ', 'บรรทัด\nใหม่', None],
+    ['\\N', '\\', "it's"],
+    ['', None, ''],
+    ['\r\n', '\t\t', '😀é']
+])
+def test_round_trip(values):
+    line = encode_row(values)
+    assert '\n' not in line
+    assert decode_row(line) == values
+    assert decode_rows([line]) == [values]
+
+# --- SQL ---
+
+@pytest.mark.parametrize('line', [
+    'a1\tกิโลกรัม',
+    "it's\t\\N",
+    '\\N\t\\N',
+    '\\\\N\t\\N',
+    'ก\\tข\\nค\t\\N',
+    "ก\\tข\t'q'",
+    '\\340\\270\\201\t\\N',
+    'ชื่อ\\\tสินค้า\t\\N',
+    'a\\Nb\t\\\\'
+])
+def test_sql_values_matches_decode_row(line):
+    data = line.encode('utf-8')
+    assert sql_values(data) == expected_sql(line)
+    assert sql_values_rows([data, data]) == [expected_sql(line)] * 2
+
+def test_sql_literal():
+    assert sql_literal(None) == 'NULL'
+    assert sql_literal("ร้าน'ก'") == "'ร้าน''ก'''"
+
+def test_random_rows_round_trip_and_match_sql():
+    pieces = ['ก', 'ภาษาไทย', '\t', '\n', '\r', '\\', '\b', '\f', '\v', "'", 'a', 'N', '\\N', '7', 'é', '😀']
+    rng = random.Random(28)
+    lines = []
+    for _ in range(2000):
+        values = [
+            None if rng.random() < 0.2 else ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 6)))
+            for _ in range(rng.randint(1, 5))
+        ]
+        line = encode_row(values)
+        assert decode_row(line) == values
+        assert sql_values(line.encode('utf-8')) == expected_sql(line)
+        lines.append(line)
+
+    assert sql_values_rows([line.encode('utf-8') for line in lines]) == [expected_sql(line) for line in lines]
@@ -0,0 +1,288 @@
+"""
+ทดสอบ wal_archive.py และขั้นตอน point-in-time recovery ใน restore_postgres.py
+
+รัน: python3 -m pytest test_wal_archive.py
+integration test จะรันเมื่อมี initdb / pg_ctl / pg_basebackup / psql ใน PATH เท่านั้น
+(และต้องไม่รันด้วย root เพราะ PostgreSQL ไม่ยอม start)
+"""
+
+import gzip
+import os
+import shutil
+import socket
+import subprocess
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+from restore_postgres import prepare_pitr_data_dir, select_base_backup
+from wal_archive import (
+    archive_wal,
+    build_wal_command,
+    list_base_backups,
+    quote_conf_value,
+    restore_partial_wal,
+    restore_wal,
+    run_base_backup,
+    select_base_backups_to_delete,
+    select_wal_files_to_delete
+)
+
+SEGMENT = '000000010000000000000003'
+
+def write_wal(path, data):
+    path.write_bytes(data)
+    return path
+
+def make_backup(name, finished_at, start_wal=SEGMENT):
+    return {
+        'path': Path(name),
+        'started_at': finished_at - timedelta(minutes=5),
+        'finished_at': finished_at,
+        'start_wal': start_wal
+    }
+
+# --- archive_wal / restore_wal ---
+
+def test_archive_and_restore_round_trip(tmp_path):
+    wal_dir = tmp_path / 'wal'
+    data = os.urandom(64 * 1024)
+    source = write_wal(tmp_path / SEGMENT, data)
+
+    assert archive_wal(source, SEGMENT, wal_dir, 6) == 0
+    assert os.listdir(wal_dir) == [f'{SEGMENT}.gz']
+    assert gzip.decompress((wal_dir / f'{SEGMENT}.gz').read_bytes()) == data
+
+    target = tmp_path / 'RECOVERYXLOG'
+    assert restore_wal(SEGMENT, target, wal_dir) == 0
+    assert target.read_bytes() == data
+
+def test_archive_same_content_again_is_idempotent(tmp_path):
+    wal_dir = tmp_path / 'wal'
+    source = write_wal(tmp_path / SEGMENT, b'wal data')
+
+    assert archive_wal(source, SEGMENT, wal_dir, 6) == 0
+    archived = (wal_dir / f'{SEGMENT}.gz').read_bytes()
+    assert archive_wal(source, SEGMENT, wal_dir, 1) == 0
+    assert (wal_dir / f'{SEGMENT}.gz').read_bytes() == archived
+
+def test_archive_different_content_fails(tmp_path):
+    wal_dir = tmp_path / 'wal'
+    assert archive_wal(write_wal(tmp_path / 'a', b'first'), SEGMENT, wal_dir, 6) == 0
+    assert archive_wal(write_wal(tmp_path / 'b', b'second'), SEGMENT, wal_dir, 6) == 1
+
+    target = tmp_path / 'RECOVERYXLOG'
+    assert restore_wal(SEGMENT, target, wal_dir) == 0
+    assert target.read_bytes() == b'first'
+
+def test_archive_rejects_invalid_name(tmp_path):
+    source = write_wal(tmp_path / 'x', b'data')
+    assert archive_wal(source, '../etc/passwd', tmp_path / 'wal', 6) == 1
+
+def test_restore_missing_wal_returns_1(tmp_path):
+    (tmp_path / 'wal').mkdir()
+    assert restore_wal('00000002.history', tmp_path / 'RECOVERYHISTORY', tmp_path / 'wal') == 1
+    assert not (tmp_path / 'RECOVERYHISTORY').exists()
+
+def test_restore_uncompressed_wal(tmp_path):
+    wal_dir = tmp_path / 'wal'
+    wal_dir.mkdir()
+    write_wal(wal_dir / SEGMENT, b'plain')
+
+    assert restore_wal(SEGMENT, tmp_path / 'RECOVERYXLOG', wal_dir) == 0
+    assert (tmp_path / 'RECOVERYXLOG').read_bytes() == b'plain'
+
+# --- restore_partial_wal ---
+
+def test_restore_partial_wal_pads_newest_partial(tmp_path):
+    wal_dir = tmp_path / 'wal'
+    wal_dir.mkdir()
+    segment_size = 1024 * 1024
+    (wal_dir / '000000010000000000000001.gz').write_bytes(gzip.compress(os.urandom(segment_size)))
+    (wal_dir / '000000010000000000000000.partial').write_bytes(b'old')
+
+    # gzip ที่ pg_receivewal ยังเขียนไม่จบ (ไม่มี end-of-stream marker)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    streamed = b'streamed' * 100
+    partial = compressor.compress(streamed) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    (wal_dir / '000000010000000000000002.gz.partial').write_bytes(partial)
+
+    pg_wal = tmp_path / 'pg_wal'
+    assert restore_partial_wal(wal_dir, pg_wal) == '000000010000000000000002'
+    restored = (pg_wal / '000000010000000000000002').read_bytes()
+    assert len(restored) == segment_size
+    assert restored.startswith(streamed)
+    assert restored[len(streamed):].count(0) == segment_size - len(streamed)
+
+def test_restore_partial_wal_ignores_completed_segment(tmp_path):
+    wal_dir = tmp_path / 'wal'
+    wal_dir.mkdir()
+    (wal_dir / f'{SEGMENT}.gz').write_bytes(gzip.compress(b'done'))
+    (wal_dir / f'{SEGMENT}.gz.partial').write_bytes(b'')
+
+    assert restore_partial_wal(wal_dir, tmp_path / 'pg_wal') is None
+
+# --- archive_command / restore_command ---
+
+def test_wal_commands_survive_shell_and_conf_quoting(tmp_path):
+    wal_dir = tmp_path / "it's a wal dir"
+    source = write_wal(tmp_path / SEGMENT, b'quoted')
+    target = tmp_path / 'RECOVERYXLOG'
+
+    for command, path in (('archive', source), ('restore', target)):
+        conf_value = quote_conf_value(build_wal_command(command, wal_dir))
+        # PostgreSQL อ่านค่าใน postgresql.conf โดยแปลง '' กลับเป็น '
+        shell_command = conf_value[1:-1].replace("''", "'")
+        shell_command = shell_command.replace('%p', str(path)).replace('%f', SEGMENT)
+        assert subprocess.run(['sh', '-c', shell_command]).returncode == 0
+
+    assert target.read_bytes() == b'quoted'
+
+# --- retention ---
+
+def test_select_wal_files_to_delete(tmp_path):
+    wal_dir = tmp_path / 'wal'
+    wal_dir.mkdir()
+    names = [
+        '000000010000000000000001.gz',
+        '000000010000000000000002.00000028.backup.gz',
+        '000000010000000000000002.gz',
+        '000000010000000000000003.gz',
+        '000000020000000000000002.gz',
+        '000000020000000000000004.gz',
+        '000000010000000000000001.gz.partial',
+        '00000002.history.gz'
+    ]
+    for name in names:
+        (wal_dir / name).touch()
+
+    selected = [f.name for f in select_wal_files_to_delete(wal_dir, SEGMENT)]
+    assert selected == [
+        '000000010000000000000001.gz',
+        '000000010000000000000001.gz.partial',
+        '000000010000000000000002.00000028.backup.gz',
+        '000000010000000000000002.gz',
+        '000000020000000000000002.gz'
+    ]
+
+def test_select_wal_files_to_delete_without_start_wal(tmp_path):
+    (tmp_path / '000000010000000000000001.gz').touch()
+    assert select_wal_files_to_delete(tmp_path, None) == []
+    assert select_wal_files_to_delete(tmp_path / 'missing', SEGMENT) == []
+
+def test_select_base_backups_to_delete():
+    now = datetime.now(timezone.utc)
+    backups = [make_backup(f'base_{days}', now - timedelta(days=days)) for days in (30, 20, 10, 1)]
+
+    selected = select_base_backups_to_delete(backups, 7, 2)
+    assert [b['path'].name for b in selected] == ['base_30', 'base_20']
+
+    # เก็บขั้นต่ำ 3 ชุด แม้ base_10 จะเก่ากว่า max_days
+    selected = select_base_backups_to_delete(backups, 7, 3)
+    assert [b['path'].name for b in selected] == ['base_30']
+
+    assert select_base_backups_to_delete(backups, 60, 1) == []
+
+def test_select_base_backups_to_delete_keeps_at_least_one():
+    now = datetime.now(timezone.utc)
+    backups = [make_backup(f'base_{days}', now - timedelta(days=days)) for days in (30, 20)]
+
+    selected = select_base_backups_to_delete(backups, 7, 0)
+    assert [b['path'].name for b in selected] == ['base_30']
+
+def test_select_base_backup():
+    now = datetime.now(timezone.utc)
+    backups = [make_backup(f'base_{days}', now - timedelta(days=days)) for days in (3, 2, 1)]
+
+    assert select_base_backup(backups, now - timedelta(days=2))['path'].name == 'base_2'
+    assert select_base_backup(backups, now - timedelta(hours=36))['path'].name == 'base_2'
+    assert select_base_backup(backups, now)['path'].name == 'base_1'
+    assert select_base_backup(backups, now - timedelta(days=4)) is None
+
+# --- integration กับ PostgreSQL จริง ---
+
+PG_TOOLS = ('initdb', 'pg_ctl', 'pg_basebackup', 'psql')
+
+requires_postgres = pytest.mark.skipif(
+    not all(shutil.which(tool) for tool in PG_TOOLS) or (hasattr(os, 'geteuid') and os.geteuid() == 0),
+    reason='ต้องมี PostgreSQL server tools ใน PATH และรันด้วย user ที่ไม่ใช่ root'
+)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return str(s.getsockname()[1])
+
+def psql(socket_dir, port, sql):
+    result = subprocess.run(
+        ['psql', '-h', str(socket_dir), '-p', port, '-U', 'postgres', '-d', 'postgres',
+         '-v', 'ON_ERROR_STOP=1', '-Atc', sql],
+        capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip()
+
+def pg_ctl(data_dir, *args):
+    subprocess.run(['pg_ctl', '-D', str(data_dir), '-w', *args], capture_output=True, check=True)
+
+def wait_for(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if condition():
+                return
+        except subprocess.CalledProcessError:
+            pass  # server ยังไม่พร้อมรับ connection
+        time.sleep(0.2)
+    pytest.fail('timeout')
+
+@requires_postgres
+def test_point_in_time_recovery(tmp_path):
+    data_dir = tmp_path / 'data'
+    socket_dir = tmp_path / 'sock'
+    socket_dir.mkdir()
+    archive_config = {
+        'wal_dir': tmp_path / 'archive' / 'wal',
+        'base_dir': tmp_path / 'archive' / 'base'
+    }
+    port = free_port()
+
+    subprocess.run(['initdb', '-D', str(data_dir), '-U', 'postgres', '--auth=trust'],
+                   capture_output=True, check=True)
+    with open(data_dir / 'postgresql.conf', 'a', encoding='utf-8') as f:
+        f.write(f"port = {port}\n")
+        f.write("listen_addresses = ''\n")
+        f.write(f"unix_socket_directories = {quote_conf_value(str(socket_dir))}\n")
+        f.write("wal_level = replica\n")
+        f.write("archive_mode = on\n")
+        f.write(f"archive_command = {quote_conf_value(build_wal_command('archive', archive_config['wal_dir']))}\n")
+
+    pg_ctl(data_dir, '-l', str(tmp_path / 'primary.log'), 'start')
+    try:
+        config = {'host': str(socket_dir), 'port': port, 'username': 'postgres', 'password': ''}
+        assert run_base_backup(config, archive_config)
+
+        psql(socket_dir, port, 'CREATE TABLE pitr_check (id int)')
+        psql(socket_dir, port, 'INSERT INTO pitr_check VALUES (1)')
+        time.sleep(1)
+        epoch = psql(socket_dir, port, 'SELECT extract(epoch FROM clock_timestamp())')
+        target_time = datetime.fromtimestamp(float(epoch), timezone.utc)
+        time.sleep(1)
+        psql(socket_dir, port, 'INSERT INTO pitr_check VALUES (2)')
+        last_segment = psql(socket_dir, port, 'SELECT pg_walfile_name(pg_switch_wal())')
+        wait_for(lambda: (archive_config['wal_dir'] / f'{last_segment}.gz').exists())
+    finally:
+        pg_ctl(data_dir, '-m', 'fast', 'stop')
+
+    base_backup = select_base_backup(list_base_backups(archive_config['base_dir']), target_time)
+    pitr_dir = tmp_path / 'pitr'
+    assert prepare_pitr_data_dir(base_backup, pitr_dir, target_time, archive_config['wal_dir'])
+
+    pg_ctl(pitr_dir, '-l', str(tmp_path / 'pitr.log'), '-o', f'-p {port}', 'start')
+    try:
+        wait_for(lambda: psql(socket_dir, port, 'SELECT pg_is_in_recovery()') == 'f')
+        assert psql(socket_dir, port, 'SELECT id FROM pitr_check ORDER BY id') == '1'
+    finally:
+        pg_ctl(pitr_dir, '-m', 'fast', 'stop')
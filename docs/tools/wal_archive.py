@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+"""
+PostgreSQL WAL Archive Script
+จัดการ base backup (pg_basebackup) และ continuous WAL archiving
+สำหรับทำ point-in-time recovery (PITR) ร่วมกับ restore_postgres.py
+
+คำสั่งที่ใช้:
+  setup        แสดงค่าที่ต้องตั้งใน postgresql.conf
+  archive      ใช้เป็น archive_command ของ PostgreSQL
+  restore      ใช้เป็น restore_command ตอนทำ PITR
+  base-backup  สร้าง base backup ใหม่ด้วย pg_basebackup
+  receive      stream WAL แบบต่อเนื่องด้วย pg_receivewal
+  cleanup      ลบ base backup และ WAL เก่าตาม retention
+  list         แสดงรายการ base backup และ WAL ที่มีอยู่
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import tarfile
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from dotenv import load_dotenv
+
+# ชื่อไฟล์ WAL เช่น 000000010000000000000002, 00000002.history,
+# 000000010000000000000002.00000028.backup
+WAL_SEGMENT_RE = re.compile(r'^[0-9A-F]{24}$')
+WAL_FILE_RE = re.compile(r'^([0-9A-F]{8}\.history|[0-9A-F]{24}(\.[0-9A-F]{8}\.backup)?)$')
+START_WAL_RE = re.compile(r'^START WAL LOCATION: .* \(file ([0-9A-F]{24})\)$', re.MULTILINE)
+
+BACKUP_INFO_FILE = 'backup_info.json'
+# segment ที่ pg_receivewal กำลังเขียนอยู่
+PARTIAL_WAL_RE = re.compile(r'^([0-9A-F]{24})(\.gz)?\.partial$')
+DEFAULT_WAL_SEGMENT_SIZE = 16 * 1024 * 1024
+
+def load_environment():
+    """โหลดไฟล์ .env"""
+    env_paths = [
+        '.env',
+        '../.env',
+        '../../.env',
+        '.env.local',
+        '.env.production',
+        '.env.development'
+    ]
+
+    for env_path in env_paths:
+        if os.path.exists(env_path):
+            load_dotenv(env_path)
+            return True
+
+    return False
+
+def get_database_config():
+    """ดึงการตั้งค่าฐานข้อมูลจาก environment variables"""
+    config = {
+        'host': os.getenv('BACKUP_DATABASE_HOST', ''),
+        'port': os.getenv('BACKUP_DATABASE_PORT', ''),
+        'username': os.getenv('BACKUP_DATABASE_USER', ''),
+        'password': os.getenv('BACKUP_DATABASE_PASSWORD', '')
+    }
+
+    missing_vars = []
+    for key, value in config.items():
+        if not value and key != 'password':  # password อาจเป็นค่าว่างได้
+            missing_vars.append(key)
+
+    if missing_vars:
+        print(f"❌ ขาด environment variables: {', '.join(missing_vars)}")
+        print("กรุณาตั้งค่าในไฟล์ .env:")
+        for var in missing_vars:
+            print(f"  BACKUP_DATABASE_{var.upper()}=your_value")
+        return None
+
+    return config
+
+def get_archive_config():
+    """ดึงการตั้งค่า WAL archive จาก environment variables"""
+    config = {
+        'wal_dir': Path(os.getenv('WAL_ARCHIVE_DIR', 'backups/wal')).resolve(),
+        'base_dir': Path(os.getenv('BASE_BACKUP_DIR', 'backups/base')).resolve(),
+        'compress_level': int(os.getenv('WAL_COMPRESS_LEVEL', '6')),
+        'archive_timeout': int(os.getenv('WAL_ARCHIVE_TIMEOUT', '60')),
+        'max_days': int(os.getenv('BASE_BACKUP_MAX_DAYS', '7')),
+        'keep_minimum': int(os.getenv('BASE_BACKUP_KEEP_MINIMUM', '2')),
+        'receive_slot': os.getenv('WAL_RECEIVE_SLOT', 'wal_archive')
+    }
+
+    return config
+
+def get_pg_env(config):
+    """สร้าง environment สำหรับรัน PostgreSQL client tools"""
+    return dict(os.environ, PGPASSWORD=config['password']) if config['password'] else os.environ
+
+def fsync_directory(directory):
+    """fsync โฟลเดอร์เพื่อให้การ rename ลงดิสก์จริง"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # บางระบบ (เช่น Windows) เปิดโฟลเดอร์ไม่ได้
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def read_wal_file(path):
+    """อ่านไฟล์ WAL ใน archive (รองรับทั้งไฟล์ .gz และไฟล์ไม่บีบอัด)"""
+    if path.suffix == '.gz':
+        with gzip.open(path, 'rb') as f:
+            return f.read()
+    return path.read_bytes()
+
+def find_archived_wal(wal_dir, wal_name):
+    """หาไฟล์ WAL ใน archive ตามชื่อที่ PostgreSQL ขอ"""
+    for candidate in (wal_dir / f"{wal_name}.gz", wal_dir / wal_name):
+        if candidate.exists():
+            return candidate
+    return None
+
+def archive_wal(wal_path, wal_name, wal_dir, compress_level):
+    """
+    บีบอัดไฟล์ WAL เข้า archive (ใช้เป็น archive_command)
+    คืนค่า 0 เมื่อสำเร็จ ค่าอื่นเมื่อล้มเหลว ให้ PostgreSQL retry เอง
+    """
+    if not WAL_FILE_RE.match(wal_name):
+        print(f"❌ ชื่อไฟล์ WAL ไม่ถูกต้อง: {wal_name}", file=sys.stderr)
+        return 1
+
+    wal_dir.mkdir(parents=True, exist_ok=True)
+    target = wal_dir / f"{wal_name}.gz"
+
+    with open(wal_path, 'rb') as f:
+        data = f.read()
+
+    # ถ้ามีไฟล์อยู่แล้ว (เช่น archive ซ้ำหลัง crash) ต้องมีเนื้อหาเหมือนกันเท่านั้น
+    existing = find_archived_wal(wal_dir, wal_name)
+    if existing:
+        if read_wal_file(existing) == data:
+            return 0
+        print(f"❌ ไฟล์ {existing.name} มีอยู่แล้วใน archive แต่เนื้อหาไม่ตรงกัน", file=sys.stderr)
+        return 1
+
+    # เขียนลงไฟล์ชั่วคราวก่อนแล้วค่อย rename เพื่อไม่ให้มีไฟล์ครึ่งๆ กลางๆ ใน archive
+    tmp_path = wal_dir / f".{wal_name}.gz.tmp"
+    try:
+        with open(tmp_path, 'wb') as raw:
+            with gzip.GzipFile(filename=wal_name, mode='wb', fileobj=raw,
+                               compresslevel=compress_level, mtime=0) as gz:
+                gz.write(data)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, target)
+        fsync_directory(wal_dir)
+    except OSError as e:
+        print(f"❌ archive {wal_name} ล้มเหลว: {e}", file=sys.stderr)
+        tmp_path.unlink(missing_ok=True)
+        return 1
+
+    return 0
+
+def restore_wal(wal_name, target_path, wal_dir):
+    """
+    คืนไฟล์ WAL จาก archive (ใช้เป็น restore_command)
+    ถ้าไม่พบไฟล์ต้องคืนค่าไม่เป็น 0 โดยไม่แสดง error เพราะ PostgreSQL
+    จะขอไฟล์ที่ยังไม่มี (เช่น .history ถัดไป) เป็นเรื่องปกติ
+    """
+    source = find_archived_wal(wal_dir, wal_name)
+    if not source:
+        return 1
+
+    target_path = Path(target_path)
+    tmp_path = target_path.with_name(target_path.name + '.tmp')
+    try:
+        if source.suffix == '.gz':
+            with gzip.open(source, 'rb') as fin, open(tmp_path, 'wb') as fout:
+                shutil.copyfileobj(fin, fout, 1024 * 1024)
+        else:
+            shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, target_path)
+    except (OSError, EOFError) as e:
+        print(f"❌ restore {wal_name} ล้มเหลว: {e}", file=sys.stderr)
+        tmp_path.unlink(missing_ok=True)
+        return 1
+
+    return 0
+
+def get_wal_segment_size(wal_dir):
+    """
+    หาขนาด WAL segment จาก segment ที่ archive ไว้แล้ว
+    ไฟล์ gzip เก็บขนาดก่อนบีบอัดไว้ใน 4 byte สุดท้าย จึงไม่ต้องแตกไฟล์ทั้งไฟล์
+    """
+    for wal_file in sorted(wal_dir.iterdir()) if wal_dir.exists() else []:
+        name = wal_file.name
+        if WAL_SEGMENT_RE.match(name):
+            return wal_file.stat().st_size
+        if name.endswith('.gz') and WAL_SEGMENT_RE.match(name[:-3]):
+            with open(wal_file, 'rb') as f:
+                f.seek(-4, os.SEEK_END)
+                return int.from_bytes(f.read(4), 'little')
+    return DEFAULT_WAL_SEGMENT_SIZE
+
+def find_latest_partial_wal(wal_dir):
+    """หาไฟล์ .partial ที่ใหม่ที่สุดจาก pg_receivewal ซึ่งยังไม่มี segment ที่สมบูรณ์ใน archive"""
+    if not wal_dir.exists():
+        return None
+
+    partials = []
+    for wal_file in wal_dir.iterdir():
+        m = PARTIAL_WAL_RE.match(wal_file.name)
+        if m and not find_archived_wal(wal_dir, m.group(1)):
+            partials.append((wal_segment_key(m.group(1)), m.group(1), wal_file))
+
+    if not partials:
+        return None
+    _, wal_name, wal_file = max(partials)
+    return wal_name, wal_file
+
+def restore_partial_wal(wal_dir, pg_wal_dir):
+    """
+    คืน segment ล่าสุดที่ pg_receivewal ยังเขียนไม่เสร็จ (.partial) ไปไว้ใน pg_wal
+    restore_command หา segment นี้ไม่เจอ PostgreSQL จึงอ่านต่อจาก pg_wal
+    ทำให้กู้ข้อมูลได้ถึงวินาทีล่าสุดที่ stream มา แทนที่จะหยุดที่ segment สุดท้ายที่สมบูรณ์
+    คืนค่าชื่อ segment หรือ None ถ้าไม่มีไฟล์ .partial
+    """
+    latest = find_latest_partial_wal(wal_dir)
+    if not latest:
+        return None
+
+    wal_name, wal_file = latest
+    data = wal_file.read_bytes()
+    if wal_file.name.endswith('.gz.partial'):
+        # ไฟล์ gzip ที่ยังเขียนไม่จบ ไม่มี end-of-stream marker จึงใช้ gzip.open ไม่ได้
+        data = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(data)
+
+    # PostgreSQL ต้องการไฟล์ขนาดเต็ม segment ส่วนที่เหลือเติมด้วย 0
+    segment_size = get_wal_segment_size(wal_dir)
+    pg_wal_dir.mkdir(parents=True, exist_ok=True)
+    (pg_wal_dir / wal_name).write_bytes(data.ljust(segment_size, b'\0'))
+    return wal_name
+
+def build_wal_command(command, wal_dir):
+    """
+    สร้าง shell command สำหรับ archive_command / restore_command
+    quote path ทุกตัวเพราะ PostgreSQL รันผ่าน shell (path อาจมีช่องว่างหรือ ')
+    """
+    script_path = Path(__file__).resolve()
+    placeholders = '"%p" "%f"' if command == 'archive' else '"%f" "%p"'
+    return (f"{shlex.quote(sys.executable)} {shlex.quote(str(script_path))} {command} "
+            f"{placeholders} --wal-dir {shlex.quote(str(wal_dir))}")
+
+def quote_conf_value(value):
+    """ครอบค่าด้วย ' สำหรับ postgresql.conf (' ในค่าต้องเขียนเป็น '')"""
+    return "'" + value.replace("'", "''") + "'"
+
+def show_setup(archive_config):
+    """แสดงค่าที่ต้องตั้งใน postgresql.conf สำหรับเปิด WAL archiving"""
+    wal_dir = archive_config['wal_dir']
+
+    print("📝 เพิ่มค่าต่อไปนี้ใน postgresql.conf แล้ว restart PostgreSQL:")
+    print()
+    print("wal_level = replica")
+    print("archive_mode = on")
+    print(f"archive_command = {quote_conf_value(build_wal_command('archive', wal_dir))}")
+    print(f"archive_timeout = {archive_config['archive_timeout']}")
+    print()
+    print(f"ℹ️  ถ้าใช้แค่ archive_command ข้อมูลอาจหายได้สูงสุด {archive_config['archive_timeout']} วินาที (archive_timeout)")
+    print("   ถ้าต้องการให้เหลือเฉพาะ WAL ที่ server ยังส่งไม่ถึง (ปกติไม่ถึงวินาที) ให้รัน 'wal_archive.py receive' ควบคู่ไปด้วย")
+    print("   receive ใช้ pg_receivewal --synchronous ซึ่ง flush และ fsync ทุกครั้งที่ได้รับ WAL")
+    print("   แต่ไม่ใช่ synchronous replication จึงไม่รับประกันว่า transaction ที่ commit แล้วจะไม่หายเลย")
+    print(f"   receive ใช้ replication slot '{archive_config['receive_slot']}' server จะเก็บ WAL ไว้จนกว่าจะ stream ได้")
+    print("   ถ้าเลิกใช้ receive ต้องลบ slot ด้วย ไม่เช่นนั้น pg_wal จะโตไม่หยุด:")
+    print(f"   pg_receivewal --drop-slot --slot={archive_config['receive_slot']}")
+    print(f"ℹ️  โฟลเดอร์ {wal_dir} ต้องเขียนได้โดย user ที่รัน PostgreSQL server")
+    print("ℹ️  user ที่ใช้ทำ base backup ต้องมีสิทธิ์ REPLICATION")
+
+def list_base_backups(base_dir):
+    """แสดงรายการ base backup ที่สมบูรณ์ เรียงจากเก่าไปใหม่"""
+    if not base_dir.exists():
+        return []
+
+    backups = []
+    for backup_path in sorted(base_dir.iterdir()):
+        info_path = backup_path / BACKUP_INFO_FILE
+        if not info_path.exists():
+            continue  # base backup ที่ยังไม่เสร็จหรือล้มเหลว
+        with open(info_path, encoding='utf-8') as f:
+            info = json.load(f)
+        info['path'] = backup_path
+        info['started_at'] = datetime.fromisoformat(info['started_at'])
+        info['finished_at'] = datetime.fromisoformat(info['finished_at'])
+        backups.append(info)
+
+    backups.sort(key=lambda x: x['finished_at'])
+    return backups
+
+def read_start_wal(backup_path):
+    """อ่านชื่อไฟล์ WAL แรกที่ base backup ต้องใช้ จาก backup_label ใน base.tar.gz"""
+    with tarfile.open(backup_path / 'base.tar.gz', 'r:gz') as tar:
+        member = tar.extractfile('backup_label')
+        label = member.read().decode('utf-8')
+
+    m = START_WAL_RE.search(label)
+    return m.group(1) if m else None
+
+def run_base_backup(config, archive_config):
+    """สร้าง base backup ด้วย pg_basebackup (tar + gzip พร้อม WAL ที่จำเป็น)"""
+    started_at = datetime.now(timezone.utc)
+    backup_path = archive_config['base_dir'] / f"base_{started_at.strftime('%Y%m%d_%H%M%S')}"
+    archive_config['base_dir'].mkdir(parents=True, exist_ok=True)
+
+    cmd = [
+        'pg_basebackup',
+        '--host=' + config['host'],
+        '--port=' + config['port'],
+        '--username=' + config['username'],
+        '--pgdata=' + str(backup_path),
+        '--format=tar',
+        '--gzip',
+        '--wal-method=stream',
+        '--checkpoint=fast',
+        '--label=wal_archive ' + started_at.isoformat()
+    ]
+
+    print(f"🔄 เริ่ม base backup...")
+    print(f"   Server: {config['host']}")
+    print(f"   Output: {backup_path}")
+
+    try:
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            env=get_pg_env(config)
+        )
+    except FileNotFoundError:
+        print("❌ ไม่พบ pg_basebackup command")
+        print("กรุณาติดตั้ง PostgreSQL client tools")
+        return None
+
+    if result.returncode != 0:
+        print("❌ Base backup ล้มเหลว!")
+        print(f"Error: {result.stderr}")
+        shutil.rmtree(backup_path, ignore_errors=True)
+        return None
+
+    finished_at = datetime.now(timezone.utc)
+    info = {
+        'started_at': started_at.isoformat(),
+        'finished_at': finished_at.isoformat(),
+        'start_wal': read_start_wal(backup_path),
+        'host': config['host'],
+        'port': config['port']
+    }
+
+    # เขียน backup_info.json เป็นขั้นตอนสุดท้าย ใช้เป็นตัวบอกว่า backup สมบูรณ์
+    with open(backup_path / BACKUP_INFO_FILE, 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+
+    size_mb = sum(p.stat().st_size for p in backup_path.iterdir()) / 1024 / 1024
+    print("✅ Base backup สำเร็จ!")
+    print(f"📁 โฟลเดอร์: {backup_path}")
+    print(f"📏 ขนาด: {size_mb:.2f} MB")
+    print(f"🧾 WAL เริ่มต้น: {info['start_wal']}")
+    return backup_path
+
+def run_receive_wal(config, archive_config):
+    """
+    stream WAL แบบต่อเนื่องด้วย pg_receivewal เพื่อลด RPO ให้เหลือระดับวินาที
+    ใช้ replication slot เพื่อไม่ให้ server ลบ WAL ที่ยัง stream ไม่ได้ และให้ pg_receivewal
+    reconnect เองเมื่อการเชื่อมต่อหลุด
+    """
+    archive_config['wal_dir'].mkdir(parents=True, exist_ok=True)
+
+    connection = [
+        '--host=' + config['host'],
+        '--port=' + config['port'],
+        '--username=' + config['username'],
+        '--slot=' + archive_config['receive_slot']
+    ]
+    create_slot_cmd = ['pg_receivewal', *connection, '--create-slot', '--if-not-exists']
+    cmd = [
+        'pg_receivewal',
+        *connection,
+        '--directory=' + str(archive_config['wal_dir']),
+        '--compress=' + str(archive_config['compress_level']),
+        # flush gzip buffer และ fsync ทุกครั้งที่ได้รับ WAL ไม่เช่นนั้นข้อมูลจะค้างใน buffer
+        # ของ zlib จนกว่า segment จะปิด และไฟล์ .partial จะตามหลัง server หลายนาที
+        '--synchronous'
+    ]
+
+    print(f"🔄 เริ่ม stream WAL ไปที่ {archive_config['wal_dir']} (กด Ctrl+C เพื่อหยุด)")
+    print(f"   Replication slot: {archive_config['receive_slot']}")
+
+    try:
+        result = subprocess.run(create_slot_cmd, capture_output=True, text=True, env=get_pg_env(config))
+        if result.returncode != 0:
+            print("❌ ไม่สามารถสร้าง replication slot ได้")
+            print(f"Error: {result.stderr}")
+            return result.returncode
+        return subprocess.run(cmd, env=get_pg_env(config)).returncode
+    except FileNotFoundError:
+        print("❌ ไม่พบ pg_receivewal command")
+        print("กรุณาติดตั้ง PostgreSQL client tools")
+        return 1
+    except KeyboardInterrupt:
+        print("\n✅ หยุด stream WAL")
+        return 0
+
+def wal_segment_key(wal_name):
+    """
+    key สำหรับเปรียบเทียบลำดับไฟล์ WAL โดยไม่สนใจ timeline
+    (ใช้หลักเดียวกับ pg_archivecleanup)
+    """
+    return wal_name[8:24]
+
+def select_base_backups_to_delete(base_backups, max_days, keep_minimum):
+    """เลือก base backup ที่เก่ากว่า max_days โดยเก็บอันใหม่สุดไว้อย่างน้อย keep_minimum"""
+    # ต้องเหลือ base backup อย่างน้อย 1 ชุดเสมอ ไม่เช่นนั้น WAL ใน archive จะใช้กู้ข้อมูลไม่ได้
+    keep_minimum = max(keep_minimum, 1)
+    if len(base_backups) <= keep_minimum:
+        return []
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=max_days)
+    candidates = base_backups[:len(base_backups) - keep_minimum]
+    return [backup for backup in candidates if backup['finished_at'] < cutoff]
+
+def select_wal_files_to_delete(wal_dir, oldest_start_wal):
+    """เลือกไฟล์ WAL ที่เก่ากว่า base backup ที่เก่าที่สุดที่ยังเก็บไว้"""
+    if not wal_dir.exists() or not oldest_start_wal:
+        return []
+
+    cutoff_key = wal_segment_key(oldest_start_wal)
+    files_to_delete = []
+    for wal_file in wal_dir.iterdir():
+        name = wal_file.name.split('.')[0]
+        # เก็บไฟล์ .history ไว้เสมอ เพราะเล็กและจำเป็นต่อการเลือก timeline
+        if not WAL_SEGMENT_RE.match(name):
+            continue
+        if wal_segment_key(name) < cutoff_key:
+            files_to_delete.append(wal_file)
+
+    return sorted(files_to_delete)
+
+def run_cleanup(archive_config, dry_run=False):
+    """ลบ base backup และ WAL เก่าตาม retention"""
+    base_backups = list_base_backups(archive_config['base_dir'])
+    if not base_backups:
+        print("❌ ไม่มี base backup จึงไม่ลบ WAL ใดๆ")
+        return True
+
+    backups_to_delete = select_base_backups_to_delete(
+        base_backups,
+        archive_config['max_days'],
+        archive_config['keep_minimum']
+    )
+    remaining = [b for b in base_backups if b not in backups_to_delete]
+    wal_to_delete = select_wal_files_to_delete(archive_config['wal_dir'], remaining[0]['start_wal'])
+
+    print(f"⚙️  การตั้งค่า:")
+    print(f"   เก็บ base backup ขั้นต่ำ: {archive_config['keep_minimum']} ชุด")
+    print(f"   อายุสูงสุด: {archive_config['max_days']} วัน")
+    print(f"🗑️  base backup ที่จะลบ: {len(backups_to_delete)} ชุด")
+    for backup in backups_to_delete:
+        print(f"   - {backup['path'].name}")
+    print(f"🗑️  WAL ที่จะลบ: {len(wal_to_delete)} ไฟล์ (เก่ากว่า {remaining[0]['start_wal']})")
+
+    if dry_run:
+        return True
+
+    for backup in backups_to_delete:
+        shutil.rmtree(backup['path'])
+    for wal_file in wal_to_delete:
+        wal_file.unlink()
+
+    print("✅ Cleanup เสร็จสิ้น")
+    return True
+
+def show_archive_status(archive_config):
+    """แสดงรายการ base backup และสถานะ WAL archive"""
+    base_backups = list_base_backups(archive_config['base_dir'])
+
+    print("📁 Base backup ที่มีอยู่:")
+    if not base_backups:
+        print("   (ไม่มี)")
+    for i, backup in enumerate(base_backups, 1):
+        finished = backup['finished_at'].astimezone().strftime('%Y-%m-%d %H:%M:%S %Z')
+        print(f"  {i}. {backup['path'].name} (เสร็จเมื่อ {finished}, WAL เริ่มต้น {backup['start_wal']})")
+
+    wal_dir = archive_config['wal_dir']
+    wal_files = sorted(wal_dir.iterdir()) if wal_dir.exists() else []
+    segments = [f for f in wal_files if WAL_SEGMENT_RE.match(f.name.split('.')[0]) and '.backup' not in f.name]
+    total_mb = sum(f.stat().st_size for f in wal_files) / 1024 / 1024
+
+    print(f"🧾 WAL archive: {wal_dir}")
+    print(f"   จำนวน segment: {len(segments)}")
+    print(f"   ขนาดรวม: {total_mb:.2f} MB")
+    if segments:
+        latest = max(segments, key=lambda x: x.stat().st_mtime)
+        latest_at = datetime.fromtimestamp(latest.stat().st_mtime).strftime('%Y-%m-%d %H:%M:%S')
+        print(f"   segment ล่าสุด: {latest.name} ({latest_at})")
+
+def build_parser():
+    """สร้าง argument parser"""
+    parser = argparse.ArgumentParser(description='PostgreSQL WAL archiving และ base backup')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('setup', help='แสดงค่าที่ต้องตั้งใน postgresql.conf')
+
+    archive_parser = subparsers.add_parser('archive', help='archive_command: archive ไฟล์ WAL')
+    archive_parser.add_argument('wal_path', help='%%p ของ PostgreSQL')
+    archive_parser.add_argument('wal_name', help='%%f ของ PostgreSQL')
+    archive_parser.add_argument('--wal-dir', type=Path, help='โฟลเดอร์ WAL archive')
+
+    restore_parser = subparsers.add_parser('restore', help='restore_command: คืนไฟล์ WAL')
+    restore_parser.add_argument('wal_name', help='%%f ของ PostgreSQL')
+    restore_parser.add_argument('target_path', help='%%p ของ PostgreSQL')
+    restore_parser.add_argument('--wal-dir', type=Path, help='โฟลเดอร์ WAL archive')
+
+    subparsers.add_parser('base-backup', help='สร้าง base backup ใหม่')
+    subparsers.add_parser('receive', help='stream WAL ด้วย pg_receivewal')
+
+    cleanup_parser = subparsers.add_parser('cleanup', help='ลบ base backup และ WAL เก่า')
+    cleanup_parser.add_argument('--dry-run', action='store_true', help='แสดงไฟล์ที่จะลบโดยไม่ลบจริง')
+
+    subparsers.add_parser('list', help='แสดงรายการ base backup และ WAL')
+
+    return parser
+
+def main():
+    """ฟังก์ชันหลัก"""
+    args = build_parser().parse_args()
+
+    load_environment()
+    archive_config = get_archive_config()
+
+    # archive / restore ถูกเรียกโดย PostgreSQL server จึงต้องเงียบเมื่อสำเร็จ
+    if args.command == 'archive':
+        wal_dir = args.wal_dir or archive_config['wal_dir']
+        sys.exit(archive_wal(args.wal_path, args.wal_name, wal_dir, archive_config['compress_level']))
+    if args.command == 'restore':
+        wal_dir = args.wal_dir or archive_config['wal_dir']
+        sys.exit(restore_wal(args.wal_name, args.target_path, wal_dir))
+
+    print("🐘 PostgreSQL WAL Archive Tool")
+    print("=" * 40)
+
+    if args.command == 'setup':
+        show_setup(archive_config)
+    elif args.command == 'list':
+        show_archive_status(archive_config)
+    elif args.command == 'cleanup':
+        if not run_cleanup(archive_config, args.dry_run):
+            sys.exit(1)
+    else:
+        config = get_database_config()
+        if not config:
+            sys.exit(1)
+
+        if args.command == 'base-backup':
+            if not run_base_backup(config, archive_config):
+                sys.exit(1)
+        elif args.command == 'receive':
+            sys.exit(run_receive_wal(config, archive_config))
+
+if __name__ == "__main__":
+    main()